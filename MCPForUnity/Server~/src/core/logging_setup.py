@@ -0,0 +1,250 @@
+"""
+Logging setup for the MCP for Unity Server.
+
+Loggers only ever see a QueueHandler, so a log call costs a queue put on the
+caller's thread. A single QueueListener thread owns the rotating file handler
+and does all formatting and disk I/O.
+"""
+
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import io
+import logging
+import os
+from pathlib import Path
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from core.config import ServerConfig
+
+# Resolved once at import; the location is fixed per user
+if os.name == "nt":
+    _LOG_DIR = Path(os.environ.get(
+        "APPDATA", Path.home() / "AppData" / "Roaming")) / "UnityMCP" / "Logs"
+else:
+    _LOG_DIR = Path.home() / "Library" / "Application Support" / "UnityMCP" / "Logs"
+LOG_FILE_NAME = "unity_mcp_server.log"
+
+SERVER_LOGGER_NAME = "mcp-for-unity-server"
+TELEMETRY_LOGGER_NAME = "unity-mcp-telemetry"
+
+# Third-party loggers capped at WARNING to avoid clutter during stdio handshake
+NOISY_LOGGER_NAMES = (
+    "httpx",
+    "urllib3",
+    "mcp.server.lowlevel.server",
+)
+
+# Loggers that stay on stderr (and the rotating file) during stdio sessions
+STDIO_LOGGER_NAMES = (
+    "uvicorn", "uvicorn.error", "uvicorn.access",
+    "starlette",
+    "docket", "docket.worker",
+    "fastmcp",
+)
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that writes through a large userspace buffer.
+
+    Records below ERROR stay in the buffer; ERROR and above are flushed
+    immediately, and a daemon thread flushes whatever is pending every
+    ``flush_interval`` seconds. emit() checks for rollover against a running
+    byte count instead of seeking/stat'ing the file (which would also force
+    the buffer out on every record).
+
+    Rollover only renames the live file aside and reopens a fresh one; the
+    backup shuffle runs on a single background worker so emits are not held
+    up by it. As with the stdlib handler, rollover never happens when either
+    ``maxBytes`` or ``backupCount`` is zero.
+    """
+
+    buffer_size = 64 * 1024
+    # Bytes in the file as of the last _open() plus what this process wrote
+    # since. Writes by other processes sharing the file are not counted, so
+    # with several server instances the file can grow past maxBytes before
+    # one of them rolls it over.
+    _bytes_written = 0
+
+    # Shared by all instances; one worker keeps backup shuffles in order
+    _rotation_executor = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="mcp-log-rotate")
+    _rotation_lock = threading.Lock()
+    _rotation_seq = 0
+
+    def __init__(self, *args, flush_interval: float = 30.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flush_interval = flush_interval
+        self._flush_stop = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="mcp-log-flush", daemon=True)
+        self._flusher.start()
+
+    def _open(self):
+        raw = open(self.baseFilename, self.mode + "b", buffering=0)
+        self._bytes_written = os.fstat(raw.fileno()).st_size
+        return io.TextIOWrapper(
+            io.BufferedWriter(raw, buffer_size=self.buffer_size),
+            encoding=self.encoding, errors=self.errors, write_through=False)
+
+    def doRollover(self) -> None:
+        self._bytes_written = 0
+        if self.backupCount <= 0:
+            super().doRollover()
+            return
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        with self._rotation_lock:
+            BufferedRotatingFileHandler._rotation_seq += 1
+            pending = f"{self.baseFilename}.pending-{self._rotation_seq}"
+            os.replace(self.baseFilename, pending)
+        if not self.delay:
+            self.stream = self._open()
+        self._rotation_executor.submit(self._shift_backups, pending)
+
+    def _shift_backups(self, pending: str) -> None:
+        """Move ``pending`` into the .1 slot, shifting older backups up."""
+        for i in range(self.backupCount - 1, 0, -1):
+            sfn = self.rotation_filename(f"{self.baseFilename}.{i}")
+            dfn = self.rotation_filename(f"{self.baseFilename}.{i + 1}")
+            if os.path.exists(sfn):
+                os.replace(sfn, dfn)
+        dfn = self.rotation_filename(self.baseFilename + ".1")
+        if os.path.exists(dfn):
+            os.remove(dfn)
+        self.rotate(pending, dfn)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            msg = self.format(record) + self.terminator
+            size = len(msg) if msg.isascii() else len(
+                msg.encode("utf-8", "replace"))
+            if (self.maxBytes > 0 and self.backupCount > 0
+                    and self._bytes_written + size >= self.maxBytes):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg)
+            self._bytes_written += size
+            if record.levelno >= logging.ERROR:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        self._flush_stop.set()
+        super().close()
+
+    def _flush_loop(self) -> None:
+        while not self._flush_stop.wait(self.flush_interval):
+            self.flush()
+
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_queue_handler = QueueHandler(_log_queue)
+_file_handler: BufferedRotatingFileHandler | None = None
+_listener: QueueListener | None = None
+
+
+def setup_logging(config: ServerConfig) -> logging.Handler | None:
+    """Configure stderr logging plus a rotating log file fed through a queue.
+
+    Returns the handler attached to the server loggers, or None when the
+    file handler could not be created or MCP_DISABLE_FILE_LOG is set.
+    """
+    global _file_handler, _listener
+
+    # Already configured: a second handler would duplicate every write
+    if _file_handler is not None:
+        return _queue_handler
+
+    # Resolve level and formatter once; stderr and file handlers share them
+    level = getattr(logging, config.log_level)
+    warn_level = max(logging.WARNING, level)
+    formatter = logging.Formatter(config.log_format)
+
+    # StreamHandler() defaults to sys.stderr; avoid stdout used by MCP stdio
+    stderr_handler = logging.StreamHandler()
+    stderr_handler.setFormatter(formatter)
+    logging.basicConfig(
+        level=level,
+        handlers=[stderr_handler],
+        force=True    # Ensure our handler replaces any prior stdout handlers
+    )
+    logger = logging.getLogger(SERVER_LOGGER_NAME)
+
+    # Quieten noisy third-party loggers to avoid clutter during stdio handshake
+    _configure_loggers(NOISY_LOGGER_NAMES, warn_level)
+
+    # Also write logs to a rotating file so logs are available when launched via stdio
+    if os.environ.get("MCP_DISABLE_FILE_LOG", "").lower() in ("1", "true", "yes", "on"):
+        return None
+    try:
+        _LOG_DIR.mkdir(parents=True, exist_ok=True)
+        file_handler = BufferedRotatingFileHandler(
+            _LOG_DIR / LOG_FILE_NAME, maxBytes=512*1024, backupCount=2, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        # Keep DEBUG chatter out of the file even when log_level is DEBUG
+        file_handler.setLevel(max(level, logging.INFO))
+
+        # The listener thread is the only writer; loggers just enqueue records
+        listener = QueueListener(
+            _log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+        # atexit is LIFO: drain the queue first, then flush the buffer
+        atexit.register(file_handler.flush)
+        atexit.register(listener.stop)
+        _file_handler, _listener = file_handler, listener
+
+        logger.addHandler(_queue_handler)
+        logger.propagate = False  # Prevent double logging to root logger
+        # Also route telemetry logger to the same rotating file and normal level
+        try:
+            tlog = logging.getLogger(TELEMETRY_LOGGER_NAME)
+            tlog.setLevel(level)
+            tlog.addHandler(_queue_handler)
+            tlog.propagate = False  # Prevent double logging for telemetry too
+        except Exception as exc:
+            # Never let logging setup break startup
+            logger.debug("Failed to configure telemetry logger", exc_info=exc)
+    except Exception as exc:
+        # Never let logging setup break startup
+        logger.debug("Failed to configure main logger file handler", exc_info=exc)
+
+    return _queue_handler if _listener is not None else None
+
+
+def silence_stdio_loggers(handler: logging.Handler | None) -> None:
+    """Keep uvicorn/starlette/fastmcp loggers off stdout in STDIO mode."""
+    # WARNING; use ERROR if still too chatty
+    _configure_loggers(STDIO_LOGGER_NAMES, logging.WARNING, handler)
+
+
+def _reset_logging() -> None:
+    """Tear down the file handler so setup_logging() can run again (tests)."""
+    global _file_handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        atexit.unregister(_listener.stop)
+        _listener = None
+    if _file_handler is not None:
+        atexit.unregister(_file_handler.flush)
+        _file_handler.close()
+        _file_handler = None
+    for name in (SERVER_LOGGER_NAME, TELEMETRY_LOGGER_NAME, *STDIO_LOGGER_NAMES):
+        logging.getLogger(name).removeHandler(_queue_handler)
+
+
+def _configure_loggers(names: tuple[str, ...], level: int,
+                       handler: logging.Handler | None = None) -> None:
+    """Set level, stop propagation and optionally attach ``handler``."""
+    for name in names:
+        lg = logging.getLogger(name)
+        lg.setLevel(level)
+        lg.propagate = False  # prevent duplicate root logs
+        if handler is not None:
+            lg.addHandler(handler)  # no-op if already attached
@@ -9,12 +9,12 @@ from typing import AsyncIterator, Any
 from urllib.parse import urlparse
 
 from fastmcp import FastMCP
-from logging.handlers import RotatingFileHandler
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.routing import WebSocketRoute
 
 from core.config import config
+from core.logging_setup import setup_logging, silence_stdio_loggers
 from services.custom_tool_service import CustomToolService
 from transport.plugin_hub import PluginHub
 from transport.plugin_registry import PluginRegistry
@@ -28,51 +28,9 @@ from transport.unity_instance_middleware import (
 )
 
 # Configure logging using settings from config
-logging.basicConfig(
-    level=getattr(logging, config.log_level),
-    format=config.log_format,
-    stream=None,  # None -> defaults to sys.stderr; avoid stdout used by MCP stdio
-    force=True    # Ensure our handler replaces any prior stdout handlers
-)
+_fh = setup_logging(config)
 logger = logging.getLogger("mcp-for-unity-server")
 
-# Also write logs to a rotating file so logs are available when launched via stdio
-try:
-    _log_dir = os.path.join(os.path.expanduser(
-        "~/Library/Application Support/UnityMCP"), "Logs")
-    os.makedirs(_log_dir, exist_ok=True)
-    _file_path = os.path.join(_log_dir, "unity_mcp_server.log")
-    _fh = RotatingFileHandler(
-        _file_path, maxBytes=512*1024, backupCount=2, encoding="utf-8")
-    _fh.setFormatter(logging.Formatter(config.log_format))
-    _fh.setLevel(getattr(logging, config.log_level))
-    logger.addHandler(_fh)
-    logger.propagate = False  # Prevent double logging to root logger
-    # Also route telemetry logger to the same rotating file and normal level
-    try:
-        tlog = logging.getLogger("unity-mcp-telemetry")
-        tlog.setLevel(getattr(logging, config.log_level))
-        tlog.addHandler(_fh)
-        tlog.propagate = False  # Prevent double logging for telemetry too
-    except Exception as exc:
-        # Never let logging setup break startup
-        logger.debug("Failed to configure telemetry logger", exc_info=exc)
-except Exception as exc:
-    # Never let logging setup break startup
-    logger.debug("Failed to configure main logger file handler", exc_info=exc)
-# Quieten noisy third-party loggers to avoid clutter during stdio handshake
-for noisy in (
-    "httpx", 
-    "urllib3", 
-    "mcp.server.lowlevel.server", 
-):
-    try:
-        logging.getLogger(noisy).setLevel(
-            max(logging.WARNING, getattr(logging, config.log_level)))
-        logging.getLogger(noisy).propagate = False
-    except Exception:
-        pass
-
 # Import telemetry only after logging is configured to ensure its logs use stderr and proper levels
 # Ensure a slightly higher telemetry timeout unless explicitly overridden by env
 try:
@@ -303,6 +261,7 @@ Environment Variables:
   UNITY_MCP_HTTP_URL   HTTP server URL (default: http://localhost:8080)
   UNITY_MCP_HTTP_HOST   HTTP server host (overrides URL host)
   UNITY_MCP_HTTP_PORT   HTTP server port (overrides URL port)
+  MCP_DISABLE_FILE_LOG   Skip the rotating log file; log to stderr only (set to 1/true/yes/on)
 
 Examples:
   # Use specific Unity project as default
@@ -412,18 +371,7 @@ Examples:
         # 🚨 [CRITICAL] In STDIO mode only, suppress related loggers.
         # Silence Uvicorn and related loggers to prevent stdout pollution.
         # 🚨 [CRITICAL] Prevent stdout pollution in STDIO mode
-        for name in (
-            "uvicorn", "uvicorn.error", "uvicorn.access",
-            "starlette",
-            "docket", "docket.worker",
-            "fastmcp",
-        ):
-            lg = logging.getLogger(name)
-            lg.setLevel(logging.WARNING) # ERROR if still too chatty
-            lg.propagate = False # prevent duplicate root logs
-            # If the rotating file handler was successfully created, attach it
-            if '_fh' in globals() and _fh not in lg.handlers:
-                lg.addHandler(_fh)
+        silence_stdio_loggers(_fh)
 
         mcp.run(transport='stdio')
 
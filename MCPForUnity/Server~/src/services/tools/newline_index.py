@@ -0,0 +1,56 @@
+"""
+Newline offset index used to map text offsets to 1-based (line, col).
+
+Large ASCII buffers are scanned by a Numba-compiled loop when numba is
+installed; everything else uses a regex scan. Numba is optional and never
+required to run the server, and it is only imported the first time a large
+buffer is indexed, so startup does not pay for it.
+"""
+
+from functools import lru_cache
+import re
+from typing import Callable
+
+# Below this size the regex scan wins over JIT dispatch and encoding
+NUMBA_MIN_CHARS = 64_000
+
+_NEWLINE_PATTERN = re.compile("\n")
+
+
+@lru_cache(maxsize=None)
+def _numba_scanner() -> Callable[[str], list[int]] | None:
+    """Import numba and compile the newline scan on first use; None without numba."""
+    try:
+        from numba import njit, types as nb_types
+        import numpy as np
+    except ImportError:
+        return None
+
+    # np.frombuffer over bytes gives a read-only array, so the signature must accept one
+    @njit(nb_types.int64[:](nb_types.Array(nb_types.uint8, 1, "C", readonly=True)), cache=True)
+    def scan(buf):
+        count = 0
+        for b in buf:
+            if b == 10:
+                count += 1
+        out = np.empty(count, np.int64)
+        j = 0
+        for i in range(buf.shape[0]):
+            if buf[i] == 10:
+                out[j] = i
+                j += 1
+        return out
+
+    def scan_text(text: str) -> list[int]:
+        return scan(np.frombuffer(text.encode("ascii"), dtype=np.uint8)).tolist()
+    return scan_text
+
+
+def newline_index(text: str) -> list[int]:
+    """Offsets of every "\\n" in ``text``, ascending."""
+    # Byte offsets equal str offsets only for ASCII, so other text takes the regex path
+    if len(text) > NUMBA_MIN_CHARS and text.isascii():
+        scanner = _numba_scanner()
+        if scanner is not None:
+            return scanner(text)
+    return [m.start() for m in _NEWLINE_PATTERN.finditer(text)]
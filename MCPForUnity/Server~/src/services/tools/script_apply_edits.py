@@ -1,13 +1,23 @@
 import base64
+import bisect
+from dataclasses import dataclass
+import difflib
+from functools import lru_cache
 import hashlib
+from itertools import islice
 import re
-from typing import Annotated, Any, Union
+from typing import Annotated, Any, Callable, Union
 
 from fastmcp import Context
 
 from services.registry import mcp_for_unity_tool
 from services.tools import get_unity_instance_from_context
+from services.tools.newline_index import newline_index
 from services.tools.utils import (
+    DOLLAR_BACKREF_PATTERN,
+    EDIT_FLAGS,
+    EDIT_FLAGS_NOCASE,
+    compile_pattern,
     parse_json_payload,
     apply_edits_locally,
     normalize_script_locator,
@@ -17,6 +27,170 @@ from transport.unity_transport import send_with_unity_instance
 from transport.legacy.unity_connection import async_send_command_with_retry
 
 
+# Single-key wrappers like {"replace_method": {...}}; tuple order sets precedence
+_WRAPPER_KEYS = (
+    "replace_method", "insert_method", "delete_method",
+    "replace_class", "delete_class",
+    "anchor_insert", "anchor_replace", "anchor_delete",
+)
+# (alias, canonical) field pairs, applied in order when the canonical key is absent
+_ALIAS_MAP = (
+    ("class_name", "className"),
+    ("class", "className"),
+    ("method_name", "methodName"),
+    # Some clients use a generic 'target' for method name
+    ("target", "methodName"),
+    ("method", "methodName"),
+    ("new_content", "replacement"),
+    ("newMethod", "replacement"),
+    ("new_method", "replacement"),
+    ("content", "replacement"),
+    ("after", "afterMethodName"),
+    ("after_method", "afterMethodName"),
+    ("before", "beforeMethodName"),
+    ("before_method", "beforeMethodName"),
+    ("anchorText", "anchor"),
+    ("newText", "text"),
+)
+# Ops forwarded to Unity's structured editor vs. converted to text spans
+_STRUCT_OPS = frozenset({"replace_class", "delete_class", "replace_method", "delete_method",
+                         "insert_method", "anchor_delete", "anchor_replace", "anchor_insert"})
+_TEXT_OPS = frozenset({"prepend", "append", "replace_range", "regex_replace"})
+# Routing bits; a batch is classified by OR-ing the bits of its ops
+_KIND_STRUCT = 1
+_KIND_TEXT = 2
+_KIND_OTHER = 4
+_KIND_REGEX = 8  # set alongside _KIND_TEXT for regex_replace
+_OP_KIND = {op: _KIND_STRUCT for op in _STRUCT_OPS}
+_OP_KIND.update({op: _KIND_TEXT for op in _TEXT_OPS})
+_OP_KIND["regex_replace"] = _KIND_TEXT | _KIND_REGEX
+# Field holding the regex for text ops whose spans are computed server-side
+_PATTERN_FIELDS = {"regex_replace": "pattern"}
+# Strings longer than this are hashed chunk by chunk
+_SHA_CHUNK_CHARS = 64 * 1024
+# Line terminators as Unity's ManageScript.TryIndexFromLineCol counts them
+_UNITY_LINE_BREAK_PATTERN = re.compile(r"\r\n?|\n")
+
+
+@lru_cache(maxsize=256)
+def _dollar_template(replacement: str) -> str:
+    """Turn a $1-style replacement into a Match.expand() template.
+
+    Backslashes are escaped so they stay literal, as with the $n syntax.
+    """
+    return DOLLAR_BACKREF_PATTERN.sub(r"\\g<\1>", replacement.replace("\\", "\\\\"))
+
+
+def _diff_opcodes(a: list[str], b: list[str]) -> list[tuple[str, int, int, int, int]]:
+    """SequenceMatcher opcodes for ``a`` -> ``b``, matching only the changed middle.
+
+    The common prefix/suffix (most of the file after a typical edit) is
+    trimmed first, and the remaining lines are interned to ints so the
+    matcher compares ints rather than strings. Where several alignments are
+    valid (repeated lines) the result can differ from difflib's; it is still
+    a correct edit script.
+    """
+    lo, hi_a, hi_b = 0, len(a), len(b)
+    while lo < hi_a and lo < hi_b and a[lo] == b[lo]:
+        lo += 1
+    while hi_a > lo and hi_b > lo and a[hi_a - 1] == b[hi_b - 1]:
+        hi_a -= 1
+        hi_b -= 1
+    ids: dict[str, int] = {}
+    ids_a = [ids.setdefault(ln, len(ids)) for ln in a[lo:hi_a]]
+    ids_b = [ids.setdefault(ln, len(ids)) for ln in b[lo:hi_b]]
+    codes = [("equal", 0, lo, 0, lo)] if lo else []
+    if ids_a or ids_b:
+        matcher = difflib.SequenceMatcher(None, ids_a, ids_b, autojunk=False)
+        codes.extend((tag, i1 + lo, i2 + lo, j1 + lo, j2 + lo)
+                     for tag, i1, i2, j1, j2 in matcher.get_opcodes())
+    if hi_a < len(a):
+        codes.append(("equal", hi_a, len(a), hi_b, len(b)))
+    return codes
+
+
+def _diff_range(start: int, stop: int) -> str:
+    # Same hunk range format as difflib.unified_diff
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def _unified_diff_lines(a: list[str], b: list[str], context: int):
+    """Yield difflib.unified_diff-style lines, grouping hunks from _diff_opcodes()."""
+    codes = _diff_opcodes(a, b)
+    if all(tag == "equal" for tag, *_ in codes):
+        return
+    # Trim leading/trailing context and split on long equal runs (as get_grouped_opcodes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+    groups = []
+    group: list[tuple[str, int, int, int, int]] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+
+    yield "--- before\n"
+    yield "+++ after\n"
+    for group in groups:
+        first, last = group[0], group[-1]
+        yield f"@@ -{_diff_range(first[1], last[2])} +{_diff_range(first[3], last[4])} @@\n"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in a[i1:i2]:
+                    yield " " + line
+                continue
+            if tag in ("replace", "delete"):
+                for line in a[i1:i2]:
+                    yield "-" + line
+            if tag in ("replace", "insert"):
+                for line in b[j1:j2]:
+                    yield "+" + line
+
+
+def _unified_diff(before: str, after: str, context: int = 3, limit: int = 2000) -> str:
+    """Compact before/after unified diff, truncated to ``limit`` lines to keep responses small."""
+    # No-op previews are common; skip splitting the file into lines
+    if before == after:
+        return ""
+    # Stop generating hunks once one line past the limit has been produced
+    diff = list(islice(_unified_diff_lines(
+        before.splitlines(), after.splitlines(), context), limit + 1))
+    if len(diff) > limit:
+        diff[limit:] = ["... (diff truncated) ..."]
+    return "\n".join(diff)
+
+
+def _sha256_hex(text: str, raw: bytes | None = None) -> str:
+    """SHA-256 of the UTF-8 contents, hashing ``raw`` directly when the bytes are at hand.
+
+    Large strings are encoded and hashed in chunks so no full UTF-8 copy of
+    the file is held at once.
+    """
+    if raw is not None:
+        return hashlib.sha256(raw).hexdigest()
+    if len(text) <= _SHA_CHUNK_CHARS:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    h = hashlib.sha256()
+    for i in range(0, len(text), _SHA_CHUNK_CHARS):
+        h.update(text[i:i + _SHA_CHUNK_CHARS].encode("utf-8"))
+    return h.hexdigest()
+
+
+def _resolve_op(e: dict[str, Any]) -> str:
+    """Read the op from 'op' or its aliases (operation/type/mode), lowercased."""
+    return (e.get("op") or e.get("operation") or e.get("type") or e.get("mode") or "").strip().lower()
 
 
 def _infer_class_name(script_name: str) -> str:
@@ -65,6 +239,463 @@ def _err(code: str, message: str, *, expected: dict[str, Any] | None = None, rew
         payload["data"] = data
     return payload
 
+def _writable(e: dict[str, Any], edit: dict[str, Any]) -> dict[str, Any]:
+    """``e``, copied first if it is still the caller's ``edit``."""
+    return dict(edit) if e is edit else e
+
+
+def _unwrap_and_alias(edit: dict[str, Any]) -> dict[str, Any]:
+    """Unwrap single-key wrappers and map field/op aliases to canonical keys.
+
+    The edit is copied on the first rewrite, so an already-canonical edit is
+    returned as-is.
+    """
+    # Unwrap single-key wrappers like {"replace_method": {...}}
+    wrapper_key = next((k for k in _WRAPPER_KEYS
+                        if k in edit and isinstance(edit[k], dict)), None)
+    if wrapper_key is not None:
+        edit = edit[wrapper_key]
+        e = dict(edit)
+        e["op"] = wrapper_key
+    else:
+        e = edit
+
+    # Resolve the op once; downstream code only reads e["op"]
+    op = _resolve_op(e)
+    if e.get("op") != op or any(alias in e for alias in ("operation", "type", "mode")):
+        e = _writable(e, edit)
+        e["op"] = op
+        for alias in ("operation", "type", "mode"):
+            e.pop(alias, None)
+
+    # Common field aliases
+    for src, dst in _ALIAS_MAP:
+        if src in e and dst not in e:
+            e = _writable(e, edit)
+            e[dst] = e.pop(src)
+    # anchor_method → before/after based on position (default after)
+    if "anchor_method" in e:
+        e = _writable(e, edit)
+        anchor = e.pop("anchor_method")
+        pos = (e.get("position") or "after").strip().lower()
+        if pos == "before" and "beforeMethodName" not in e:
+            e["beforeMethodName"] = anchor
+        elif "afterMethodName" not in e:
+            e["afterMethodName"] = anchor
+    if "pattern" in e and "anchor" not in e and e["op"].startswith("anchor_"):
+        e = _writable(e, edit)
+        e["anchor"] = e.pop("pattern")
+
+    # CI compatibility (T‑A/T‑E):
+    # Accept method-anchored anchor_insert and upgrade to insert_method
+    # Example incoming shape:
+    #   {"op":"anchor_insert","afterMethodName":"GetCurrentTarget","text":"..."}
+    if (
+        e.get("op") == "anchor_insert"
+        and not e.get("anchor")
+        and (e.get("afterMethodName") or e.get("beforeMethodName"))
+    ):
+        e = _writable(e, edit)
+        e["op"] = "insert_method"
+        if "replacement" not in e:
+            e["replacement"] = e.get("text", "")
+
+    # LSP-like range edit -> replace_range
+    if "range" in e and isinstance(e["range"], dict):
+        e = _writable(e, edit)
+        rng = e.pop("range")
+        start = rng.get("start", {})
+        end = rng.get("end", {})
+        # Convert 0-based to 1-based line/col
+        e["op"] = "replace_range"
+        e["startLine"] = int(start.get("line", 0)) + 1
+        e["startCol"] = int(start.get("character", 0)) + 1
+        e["endLine"] = int(end.get("line", 0)) + 1
+        e["endCol"] = int(end.get("character", 0)) + 1
+        if "newText" in edit and "text" not in e:
+            e["text"] = edit.get("newText", "")
+    return e
+
+
+def _normalize_edit(raw: dict[str, Any], name: str) -> dict[str, Any]:
+    e = _unwrap_and_alias(raw)
+    op = e["op"]
+    fixes: dict[str, Any] = {}
+
+    # Default className to script name if missing on structured method/class ops
+    if op in ("replace_class", "delete_class", "replace_method", "delete_method", "insert_method") and not e.get("className"):
+        fixes["className"] = name
+
+    # Map common aliases for text ops
+    if op in ("text_replace",):
+        fixes["op"] = "replace_range"
+    elif op in ("regex_delete",):
+        fixes["op"] = "regex_replace"
+        if "text" not in e:
+            fixes["text"] = ""
+    elif op == "regex_replace" and ("replacement" not in e):
+        if "text" in e:
+            fixes["replacement"] = e.get("text", "")
+        elif "insert" in e or "content" in e:
+            fixes["replacement"] = e.get(
+                "insert") or e.get("content") or ""
+    elif op == "anchor_insert" and not (e.get("text") or e.get("insert") or e.get("content") or e.get("replacement")):
+        fixes["op"] = "anchor_delete"
+
+    if not fixes:
+        return e
+    # Canonical edits come back uncopied; never write into the caller's dict
+    if e is raw:
+        e = dict(raw)
+    e.update(fixes)
+    return e
+
+
+# Required-field hints, built once: (message, expected, rewrite suggestion)
+_Hint = tuple[str, dict[str, Any], dict[str, Any]]
+
+_REPLACE_METHOD_EXPECTED = {"op": "replace_method", "required": [
+    "className", "methodName", "replacement"]}
+_INSERT_METHOD_EXPECTED = {"op": "insert_method", "required": ["className", "replacement"], "position": {
+    "after_requires": "afterMethodName", "before_requires": "beforeMethodName"}}
+_DELETE_METHOD_EXPECTED = {"op": "delete_method", "required": [
+    "className", "methodName"]}
+
+_HINT_REPLACE_METHOD_NAME: _Hint = (
+    "replace_method requires 'methodName'.",
+    _REPLACE_METHOD_EXPECTED,
+    {"edits[0].methodName": "HasTarget"})
+_HINT_REPLACE_METHOD_BODY: _Hint = (
+    "replace_method requires 'replacement' (inline or base64).",
+    _REPLACE_METHOD_EXPECTED,
+    {"edits[0].replacement": "public bool X(){ return true; }"})
+_HINT_INSERT_METHOD_BODY: _Hint = (
+    "insert_method requires a non-empty 'replacement'.",
+    _INSERT_METHOD_EXPECTED,
+    {"edits[0].replacement": "public void PrintSeries(){ Debug.Log(\"1,2,3\"); }"})
+_HINT_INSERT_METHOD_AFTER: _Hint = (
+    "insert_method with position='after' requires 'afterMethodName'.",
+    {"op": "insert_method", "position": {"after_requires": "afterMethodName"}},
+    {"edits[0].afterMethodName": "GetCurrentTarget"})
+_HINT_INSERT_METHOD_BEFORE: _Hint = (
+    "insert_method with position='before' requires 'beforeMethodName'.",
+    {"op": "insert_method", "position": {"before_requires": "beforeMethodName"}},
+    {"edits[0].beforeMethodName": "GetCurrentTarget"})
+_HINT_DELETE_METHOD_NAME: _Hint = (
+    "delete_method requires 'methodName'.",
+    _DELETE_METHOD_EXPECTED,
+    {"edits[0].methodName": "PrintSeries"})
+_HINT_ANCHOR = {
+    op: (f"{op} requires 'anchor' (regex).",
+         {"op": op, "required": ["anchor"]},
+         {"edits[0].anchor": "(?m)^\\s*public\\s+bool\\s+HasTarget\\s*\\("})
+    for op in ("anchor_insert", "anchor_replace", "anchor_delete")
+}
+_HINT_ANCHOR_TEXT = {
+    op: (f"{op} requires 'text'.",
+         {"op": op, "required": ["anchor", "text"]},
+         {"edits[0].text": "/* comment */\n"})
+    for op in ("anchor_insert", "anchor_replace")
+}
+
+
+def _check_replace_method(e: dict[str, Any]) -> _Hint | None:
+    if not e.get("methodName"):
+        return _HINT_REPLACE_METHOD_NAME
+    if not (e.get("replacement") or e.get("text")):
+        return _HINT_REPLACE_METHOD_BODY
+    return None
+
+
+def _check_insert_method(e: dict[str, Any]) -> _Hint | None:
+    if not (e.get("replacement") or e.get("text")):
+        return _HINT_INSERT_METHOD_BODY
+    pos = (e.get("position") or "").lower()
+    if pos == "after" and not e.get("afterMethodName"):
+        return _HINT_INSERT_METHOD_AFTER
+    if pos == "before" and not e.get("beforeMethodName"):
+        return _HINT_INSERT_METHOD_BEFORE
+    return None
+
+
+def _check_delete_method(e: dict[str, Any]) -> _Hint | None:
+    if not e.get("methodName"):
+        return _HINT_DELETE_METHOD_NAME
+    return None
+
+
+def _check_anchor(e: dict[str, Any]) -> _Hint | None:
+    op = e["op"]
+    if not e.get("anchor"):
+        return _HINT_ANCHOR[op]
+    if op in _HINT_ANCHOR_TEXT and not (e.get("text") or e.get("replacement")):
+        return _HINT_ANCHOR_TEXT[op]
+    return None
+
+
+# op -> required-field check; ops without an entry have nothing to validate
+_VALIDATORS: dict[str, Callable[[dict[str, Any]], _Hint | None]] = {
+    "replace_method": _check_replace_method,
+    "insert_method": _check_insert_method,
+    "delete_method": _check_delete_method,
+    "anchor_insert": _check_anchor,
+    "anchor_replace": _check_anchor,
+    "anchor_delete": _check_anchor,
+}
+
+
+def _normalize_edits(raw_edits: list[dict[str, Any]], name: str
+                     ) -> tuple[list[dict[str, Any]], _Hint | None]:
+    """Normalize unsupported or aliased ops to known structured/text paths.
+
+    Required fields are checked in the same pass; returns the normalized
+    edits and the hint for the first edit missing a field (or None).
+    """
+    normalized_edits: list[dict[str, Any]] = []
+    missing = None
+    for raw in raw_edits or []:
+        e = _normalize_edit(raw, name)
+        normalized_edits.append(e)
+        if missing is None:
+            check = _VALIDATORS.get(e["op"])
+            if check is not None:
+                missing = check(e)
+    return normalized_edits, missing
+
+
+def _compile_patterns(edits: list[dict[str, Any]]
+                      ) -> tuple[dict[int, re.Pattern], list[tuple[int, str]]]:
+    """Compile the regex of every text-converted edit in one pass.
+
+    Returns the compiled pattern keyed by edit index (only edits that carry
+    one), and (index, message) for each edit whose pattern does not compile.
+    """
+    regexes: dict[int, re.Pattern] = {}
+    bad: list[tuple[int, str]] = []
+    for i, e in enumerate(edits):
+        field = _PATTERN_FIELDS.get(e["op"])
+        if field is None:
+            # Structured anchors are matched (and validated) by Unity
+            continue
+        flags = EDIT_FLAGS_NOCASE if e.get("ignore_case") else EDIT_FLAGS
+        try:
+            regexes[i] = compile_pattern(e.get(field) or "", flags)
+        except re.error as ex:
+            bad.append((i, f"edits[{i}].{field}: {ex}"))
+    return regexes, bad
+
+
+def _line_col(nl_index: list[int], idx: int) -> tuple[int, int]:
+    """1-based (line, col) of offset ``idx``, given the base text's newline offsets."""
+    j = bisect.bisect_left(nl_index, idx)
+    col = idx - nl_index[j - 1] if j > 0 else idx + 1
+    return j + 1, col
+
+
+def _span_index(base_text: str, line_ends: list[int], line: int, col: int) -> int:
+    """1-based (line, col) to an offset into ``base_text``, as Unity's TryIndexFromLineCol.
+
+    ``line_ends`` holds the offset of each line terminator (see _line_ends());
+    a column may point at the terminator but not past it.
+    """
+    line, col = max(1, line), max(1, col)
+    if line > len(line_ends) + 1:
+        raise ValueError(f"line {line} out of range")
+    if line > 1:
+        prev = line_ends[line - 2]
+        start = prev + (2 if base_text.startswith("\r\n", prev) else 1)
+    else:
+        start = 0
+    stop = line_ends[line - 1] if line <= len(line_ends) else len(base_text)
+    if start + col - 1 > stop:
+        raise ValueError(f"column {col} out of range on line {line}")
+    return start + col - 1
+
+
+def _line_ends(base_text: str, nl_index: list[int]) -> list[int]:
+    """Offsets of the line terminators Unity counts: "\r\n", a lone "\r", or "\n"."""
+    if "\r" not in base_text:
+        return nl_index
+    return [m.start() for m in _UNITY_LINE_BREAK_PATTERN.finditer(base_text)]
+
+
+def _apply_spans(base_text: str, nl_index: list[int], spans: list[dict[str, Any]]) -> str:
+    """Apply apply_text_edits spans to ``base_text`` the way Unity does (used for previews).
+
+    Spans are resolved against the original text and applied back to front;
+    overlapping spans raise ValueError, as Unity rejects them.
+    """
+    line_ends = _line_ends(base_text, nl_index)
+    ranges = []
+    for sp in spans:
+        a = _span_index(base_text, line_ends, sp["startLine"], sp["startCol"])
+        b = _span_index(base_text, line_ends, sp["endLine"], sp["endCol"])
+        ranges.append((a, b, sp["newText"]) if a <= b else (b, a, sp["newText"]))
+    # Stable, like Unity's OrderByDescending; equal starts keep request order
+    ranges.sort(key=lambda r: r[0], reverse=True)
+    for later, earlier in zip(ranges, ranges[1:]):
+        if earlier[1] > later[0]:
+            raise ValueError("overlapping edit spans")
+    parts = []
+    pos = 0
+    for a, b, new_text in reversed(ranges):
+        parts.append(base_text[pos:a])
+        parts.append(new_text)
+        pos = b
+    parts.append(base_text[pos:])
+    return "".join(parts)
+
+
+def _all_matches(regex: re.Pattern, base_text: str,
+                 match_cache: dict[re.Pattern, list[re.Match]]) -> list[re.Match]:
+    """finditer() over ``base_text``, once per pattern per batch (the base is not mutated)."""
+    matches = match_cache.get(regex)
+    if matches is None:
+        matches = match_cache[regex] = list(regex.finditer(base_text))
+    return matches
+
+
+@dataclass(frozen=True)
+class _SpanRules:
+    """How one route converts edits to apply_text_edits spans."""
+
+    # Non-regex ops converted; any other op is unsupported_op
+    ops: frozenset[str]
+    # replace_range fields that must be present; missing ones default to 1
+    range_keys: tuple[str, ...]
+    # Fields read for the span's new text, in precedence order
+    text_fields: tuple[str, ...]
+    # Place regex_replace with find_best_anchor_match() rather than search()
+    best_match: bool
+
+
+_MIXED_SPAN_RULES = _SpanRules(
+    ops=frozenset({"anchor_insert", "replace_range", "prepend", "append"}),
+    range_keys=("startLine", "startCol", "endLine", "endCol"),
+    text_fields=("text", "insert", "content", "replacement"),
+    best_match=False,
+)
+_TEXT_SPAN_RULES = _SpanRules(
+    ops=frozenset({"anchor_insert", "replace_range"}),
+    range_keys=("startLine",),
+    text_fields=("text", "insert", "content"),
+    best_match=True,
+)
+
+
+def _edit_text(e: dict[str, Any], fields: tuple[str, ...]) -> str:
+    """First non-empty of ``fields`` in ``e``, or ""."""
+    return next((e[f] for f in fields if e.get(f)), "")
+
+
+def _regex_span(e: dict[str, Any], regex: re.Pattern, base_text: str,
+                nl_index: list[int], match_cache: dict[re.Pattern, list[re.Match]],
+                rules: _SpanRules) -> dict[str, Any] | None:
+    """apply_text_edits span for a regex_replace, or None when ``regex`` has no match.
+
+    ``regex`` is the pattern _compile_patterns() compiled for the edit.
+    ``match_cache`` holds each pattern's finditer() results over
+    ``base_text`` for the rest of the batch.
+    """
+    if rules.best_match:
+        m = find_best_anchor_match(regex, base_text, regex.flags, prefer_last=True,
+                                   matches=_all_matches(regex, base_text, match_cache),
+                                   newlines=nl_index)
+    else:
+        m = regex.search(base_text)
+    if not m:
+        return None
+    # Expand $1, $2... in replacement using this match; C# side validates the result
+    sl, sc = _line_col(nl_index, m.start())
+    el, ec = _line_col(nl_index, m.end())
+    return {"startLine": sl, "startCol": sc, "endLine": el, "endCol": ec,
+            "newText": m.expand(_dollar_template(_edit_text(e, rules.text_fields)))}
+
+
+def _to_atomic_span(e: dict[str, Any], base_text: str, nl_index: list[int],
+                    match_cache: dict[re.Pattern, list[re.Match]],
+                    rules: _SpanRules) -> dict[str, Any] | None:
+    """Convert one non-regex text edit into an apply_text_edits span against ``base_text``.
+
+    Returns the {startLine, startCol, endLine, endCol, newText} span or an
+    error payload (has "success") to return as-is; regex_replace edits go
+    through _regex_span().
+    """
+    op = e["op"]
+    if op not in rules.ops:
+        return {"success": False, "code": "unsupported_op",
+                "message": f"Unsupported text edit op for server-side apply_text_edits: {op}"}
+    text_field = _edit_text(e, rules.text_fields)
+    if op == "anchor_insert":
+        anchor = e.get("anchor") or ""
+        position = (e.get("position") or "after").lower()
+        flags = EDIT_FLAGS_NOCASE if e.get("ignore_case") else EDIT_FLAGS
+        try:
+            anchor_re = compile_pattern(anchor, flags)
+            m = find_best_anchor_match(anchor_re, base_text, flags, prefer_last=True,
+                                       matches=_all_matches(anchor_re, base_text, match_cache),
+                                       newlines=nl_index)
+        except Exception as ex:
+            return _err("bad_regex", f"Invalid anchor regex: {ex}",
+                        extra={"hint": "Escape parentheses/braces or use a simpler anchor."})
+        if not m:
+            return {"success": False, "code": "anchor_not_found", "message": f"anchor not found: {anchor}"}
+        idx = m.start() if position == "before" else m.end()
+        # Normalize insertion newlines to avoid jammed methods; one concat at most
+        if text_field:
+            lead = "" if text_field[0] == "\n" else "\n"
+            tail = "" if text_field[-1] == "\n" else "\n"
+            if lead or tail:
+                text_field = f"{lead}{text_field}{tail}"
+        sl, sc = _line_col(nl_index, idx)
+        return {"startLine": sl, "startCol": sc, "endLine": sl, "endCol": sc, "newText": text_field}
+    if op == "replace_range":
+        # Forwarded as-is; index-based ranges are not supported here
+        if not all(k in e for k in rules.range_keys):
+            return _err("missing_field", "replace_range requires startLine/startCol/endLine/endCol")
+        return {
+            "startLine": int(e.get("startLine", 1)),
+            "startCol": int(e.get("startCol", 1)),
+            "endLine": int(e.get("endLine", 1)),
+            "endCol": int(e.get("endCol", 1)),
+            "newText": text_field
+        }
+    if op == "prepend":
+        return {"startLine": 1, "startCol": 1, "endLine": 1, "endCol": 1, "newText": text_field}
+    # append: insert at true EOF position (handles both \n and \r\n correctly)
+    sl, sc = _line_col(nl_index, len(base_text))
+    new_text = ("\n" if not base_text.endswith("\n") else "") + text_field
+    return {"startLine": sl, "startCol": sc, "endLine": sl, "endCol": sc, "newText": new_text}
+
+
+def _build_apply_params(*, action: str, name: str, path: str, namespace: str | None,
+                        script_type: str | None, edits: list[dict[str, Any]],
+                        options: dict[str, Any], sha: str | None = None) -> dict[str, Any]:
+    """manage_script params for an 'edit' or 'apply_text_edits' call."""
+    params: dict[str, Any] = {
+        "action": action,
+        "name": name,
+        "path": path,
+        "namespace": namespace,
+        "scriptType": script_type,
+        "edits": edits,
+        "options": options,
+    }
+    if sha:
+        params["precondition_sha256"] = sha
+    return params
+
+
+def _span_options(options: dict[str, Any] | None, span_count: int) -> dict[str, Any]:
+    """apply_text_edits options; multi-span batches are always applied atomically."""
+    options = options or {}
+    return {
+        "refresh": options.get("refresh", "debounced"),
+        "validate": options.get("validate", "standard"),
+        "applyMode": "atomic" if span_count > 1 else options.get("applyMode", "sequential"),
+    }
+
+
 # Natural-language parsing removed; clients should send structured edits.
 
 
@@ -132,213 +763,29 @@ async def script_apply_edits(
     await ctx.info(
         f"Processing script_apply_edits: {name} (unity_instance={unity_instance or 'default'})")
         
-    # Parse edits if they came as a stringified JSON
-    edits = parse_json_payload(edits)
+    # Parse edits if they came as a stringified JSON; native lists skip the parser
+    if isinstance(edits, str):
+        edits = parse_json_payload(edits)
     if not isinstance(edits, list):
         return {"success": False, "message": f"Edits must be a list or JSON string of a list, got {type(edits)}"}
 
     # Normalize locator first so downstream calls target the correct script file.
     name, path = normalize_script_locator(name, path)
     # Normalize unsupported or aliased ops to known structured/text paths
-
-    def _unwrap_and_alias(edit: dict[str, Any]) -> dict[str, Any]:
-        # Unwrap single-key wrappers like {"replace_method": {...}}
-        for wrapper_key in (
-            "replace_method", "insert_method", "delete_method",
-            "replace_class", "delete_class",
-            "anchor_insert", "anchor_replace", "anchor_delete",
-        ):
-            if wrapper_key in edit and isinstance(edit[wrapper_key], dict):
-                inner = dict(edit[wrapper_key])
-                inner["op"] = wrapper_key
-                edit = inner
-                break
-
-        e = dict(edit)
-        op = (e.get("op") or e.get("operation") or e.get(
-            "type") or e.get("mode") or "").strip().lower()
-        if op:
-            e["op"] = op
-
-        # Common field aliases
-        if "class_name" in e and "className" not in e:
-            e["className"] = e.pop("class_name")
-        if "class" in e and "className" not in e:
-            e["className"] = e.pop("class")
-        if "method_name" in e and "methodName" not in e:
-            e["methodName"] = e.pop("method_name")
-        # Some clients use a generic 'target' for method name
-        if "target" in e and "methodName" not in e:
-            e["methodName"] = e.pop("target")
-        if "method" in e and "methodName" not in e:
-            e["methodName"] = e.pop("method")
-        if "new_content" in e and "replacement" not in e:
-            e["replacement"] = e.pop("new_content")
-        if "newMethod" in e and "replacement" not in e:
-            e["replacement"] = e.pop("newMethod")
-        if "new_method" in e and "replacement" not in e:
-            e["replacement"] = e.pop("new_method")
-        if "content" in e and "replacement" not in e:
-            e["replacement"] = e.pop("content")
-        if "after" in e and "afterMethodName" not in e:
-            e["afterMethodName"] = e.pop("after")
-        if "after_method" in e and "afterMethodName" not in e:
-            e["afterMethodName"] = e.pop("after_method")
-        if "before" in e and "beforeMethodName" not in e:
-            e["beforeMethodName"] = e.pop("before")
-        if "before_method" in e and "beforeMethodName" not in e:
-            e["beforeMethodName"] = e.pop("before_method")
-        # anchor_method → before/after based on position (default after)
-        if "anchor_method" in e:
-            anchor = e.pop("anchor_method")
-            pos = (e.get("position") or "after").strip().lower()
-            if pos == "before" and "beforeMethodName" not in e:
-                e["beforeMethodName"] = anchor
-            elif "afterMethodName" not in e:
-                e["afterMethodName"] = anchor
-        if "anchorText" in e and "anchor" not in e:
-            e["anchor"] = e.pop("anchorText")
-        if "pattern" in e and "anchor" not in e and e.get("op") and e["op"].startswith("anchor_"):
-            e["anchor"] = e.pop("pattern")
-        if "newText" in e and "text" not in e:
-            e["text"] = e.pop("newText")
-
-        # CI compatibility (T‑A/T‑E):
-        # Accept method-anchored anchor_insert and upgrade to insert_method
-        # Example incoming shape:
-        #   {"op":"anchor_insert","afterMethodName":"GetCurrentTarget","text":"..."}
-        if (
-            e.get("op") == "anchor_insert"
-            and not e.get("anchor")
-            and (e.get("afterMethodName") or e.get("beforeMethodName"))
-        ):
-            e["op"] = "insert_method"
-            if "replacement" not in e:
-                e["replacement"] = e.get("text", "")
-
-        # LSP-like range edit -> replace_range
-        if "range" in e and isinstance(e["range"], dict):
-            rng = e.pop("range")
-            start = rng.get("start", {})
-            end = rng.get("end", {})
-            # Convert 0-based to 1-based line/col
-            e["op"] = "replace_range"
-            e["startLine"] = int(start.get("line", 0)) + 1
-            e["startCol"] = int(start.get("character", 0)) + 1
-            e["endLine"] = int(end.get("line", 0)) + 1
-            e["endCol"] = int(end.get("character", 0)) + 1
-            if "newText" in edit and "text" not in e:
-                e["text"] = edit.get("newText", "")
-        return e
-
-    normalized_edits: list[dict[str, Any]] = []
-    for raw in edits or []:
-        e = _unwrap_and_alias(raw)
-        op = (e.get("op") or e.get("operation") or e.get(
-            "type") or e.get("mode") or "").strip().lower()
-
-        # Default className to script name if missing on structured method/class ops
-        if op in ("replace_class", "delete_class", "replace_method", "delete_method", "insert_method") and not e.get("className"):
-            e["className"] = name
-
-        # Map common aliases for text ops
-        if op in ("text_replace",):
-            e["op"] = "replace_range"
-            normalized_edits.append(e)
-            continue
-        if op in ("regex_delete",):
-            e["op"] = "regex_replace"
-            e.setdefault("text", "")
-            normalized_edits.append(e)
-            continue
-        if op == "regex_replace" and ("replacement" not in e):
-            if "text" in e:
-                e["replacement"] = e.get("text", "")
-            elif "insert" in e or "content" in e:
-                e["replacement"] = e.get(
-                    "insert") or e.get("content") or ""
-        if op == "anchor_insert" and not (e.get("text") or e.get("insert") or e.get("content") or e.get("replacement")):
-            e["op"] = "anchor_delete"
-            normalized_edits.append(e)
-            continue
-        normalized_edits.append(e)
-
-    edits = normalized_edits
+    edits, missing = _normalize_edits(edits, name)
     normalized_for_echo = edits
 
-    # Validate required fields and produce machine-parsable hints
-    def error_with_hint(message: str, expected: dict[str, Any], suggestion: dict[str, Any]) -> dict[str, Any]:
+    if missing is not None:
+        message, expected, suggestion = missing
+        # Machine-parsable hint for the first edit missing a required field
         return _err("missing_field", message, expected=expected, rewrite=suggestion, normalized=normalized_for_echo)
 
-    for e in edits or []:
-        op = e.get("op", "")
-        if op == "replace_method":
-            if not e.get("methodName"):
-                return error_with_hint(
-                    "replace_method requires 'methodName'.",
-                    {"op": "replace_method", "required": [
-                        "className", "methodName", "replacement"]},
-                    {"edits[0].methodName": "HasTarget"}
-                )
-            if not (e.get("replacement") or e.get("text")):
-                return error_with_hint(
-                    "replace_method requires 'replacement' (inline or base64).",
-                    {"op": "replace_method", "required": [
-                        "className", "methodName", "replacement"]},
-                    {"edits[0].replacement": "public bool X(){ return true; }"}
-                )
-        elif op == "insert_method":
-            if not (e.get("replacement") or e.get("text")):
-                return error_with_hint(
-                    "insert_method requires a non-empty 'replacement'.",
-                    {"op": "insert_method", "required": ["className", "replacement"], "position": {
-                        "after_requires": "afterMethodName", "before_requires": "beforeMethodName"}},
-                    {"edits[0].replacement": "public void PrintSeries(){ Debug.Log(\"1,2,3\"); }"}
-                )
-            pos = (e.get("position") or "").lower()
-            if pos == "after" and not e.get("afterMethodName"):
-                return error_with_hint(
-                    "insert_method with position='after' requires 'afterMethodName'.",
-                    {"op": "insert_method", "position": {
-                        "after_requires": "afterMethodName"}},
-                    {"edits[0].afterMethodName": "GetCurrentTarget"}
-                )
-            if pos == "before" and not e.get("beforeMethodName"):
-                return error_with_hint(
-                    "insert_method with position='before' requires 'beforeMethodName'.",
-                    {"op": "insert_method", "position": {
-                        "before_requires": "beforeMethodName"}},
-                    {"edits[0].beforeMethodName": "GetCurrentTarget"}
-                )
-        elif op == "delete_method":
-            if not e.get("methodName"):
-                return error_with_hint(
-                    "delete_method requires 'methodName'.",
-                    {"op": "delete_method", "required": [
-                        "className", "methodName"]},
-                    {"edits[0].methodName": "PrintSeries"}
-                )
-        elif op in ("anchor_insert", "anchor_replace", "anchor_delete"):
-            if not e.get("anchor"):
-                return error_with_hint(
-                    f"{op} requires 'anchor' (regex).",
-                    {"op": op, "required": ["anchor"]},
-                    {"edits[0].anchor": "(?m)^\\s*public\\s+bool\\s+HasTarget\\s*\\("}
-                )
-            if op in ("anchor_insert", "anchor_replace") and not (e.get("text") or e.get("replacement")):
-                return error_with_hint(
-                    f"{op} requires 'text'.",
-                    {"op": op, "required": ["anchor", "text"]},
-                    {"edits[0].text": "/* comment */\n"}
-                )
-
     # Decide routing: structured vs text vs mixed
-    STRUCT = {"replace_class", "delete_class", "replace_method", "delete_method",
-              "insert_method", "anchor_delete", "anchor_replace", "anchor_insert"}
-    TEXT = {"prepend", "append", "replace_range", "regex_replace"}
-    ops_set = {(e.get("op") or "").lower() for e in edits or []}
-    all_struct = ops_set.issubset(STRUCT)
-    all_text = ops_set.issubset(TEXT)
+    kinds = 0
+    for e in edits or []:
+        kinds |= _OP_KIND.get(e["op"], _KIND_OTHER)
+    all_struct = not kinds & ~_KIND_STRUCT
+    all_text = not kinds & ~(_KIND_TEXT | _KIND_REGEX)
     mixed = not (all_struct or all_text)
 
     # If everything is structured (method/class/anchor ops), forward directly to Unity's structured editor.
@@ -346,15 +793,9 @@ async def script_apply_edits(
         opts2 = dict(options or {})
         # For structured edits, prefer immediate refresh to avoid missed reloads when Editor is unfocused
         opts2.setdefault("refresh", "immediate")
-        params_struct: dict[str, Any] = {
-            "action": "edit",
-            "name": name,
-            "path": path,
-            "namespace": namespace,
-            "scriptType": script_type,
-            "edits": edits,
-            "options": opts2,
-        }
+        params_struct = _build_apply_params(
+            action="edit", name=name, path=path, namespace=namespace,
+            script_type=script_type, edits=edits, options=opts2)
         resp_struct = await send_with_unity_instance(
             async_send_command_with_retry,
             unity_instance,
@@ -365,6 +806,14 @@ async def script_apply_edits(
             pass  # Optional sentinel reload removed (deprecated)
         return _with_norm(resp_struct if isinstance(resp_struct, dict) else {"success": False, "message": str(resp_struct)}, normalized_for_echo, routing="structured")
 
+    # Compile every pattern up front so bad regexes fail before the Unity read
+    regexes, bad_regexes = _compile_patterns(edits)
+    if bad_regexes:
+        return _with_norm(_err("bad_regex", "Invalid regex pattern: " + "; ".join(msg for _, msg in bad_regexes),
+                               extra={"hint": "Escape special chars or prefer structured delete for methods.",
+                                      "badEdits": [i for i, _ in bad_regexes]}),
+                          normalized_for_echo, routing="mixed/text-first" if mixed else "text")
+
     # 1) read from Unity
     read_resp = await async_send_command_with_retry("manage_script", {
         "action": "read",
@@ -379,122 +828,46 @@ async def script_apply_edits(
     data = read_resp.get("data") or read_resp.get(
         "result", {}).get("data") or {}
     contents = data.get("contents")
+    # Raw bytes from an encoded read are kept so the precondition hash can skip re-encoding
+    raw_contents: bytes | None = None
     if contents is None and data.get("contentsEncoded") and data.get("encodedContents"):
-        contents = base64.b64decode(
-            data["encodedContents"]).decode("utf-8")
+        raw_contents = base64.b64decode(data["encodedContents"])
+        contents = raw_contents.decode("utf-8")
     if contents is None:
         return {"success": False, "message": "No contents returned from Unity read."}
 
-    # Optional preview/dry-run: apply locally and return diff without writing
+    # Optional preview/dry-run: return a diff without writing
     preview = bool((options or {}).get("preview"))
 
     # If we have a mixed batch (TEXT + STRUCT), apply text first with precondition, then structured
     if mixed:
-        text_edits = [e for e in edits or [] if (
-            e.get("op") or "").lower() in TEXT]
-        struct_edits = [e for e in edits or [] if (
-            e.get("op") or "").lower() in STRUCT]
+        struct_edits = [e for e in edits or [] if e["op"] in _STRUCT_OPS]
         try:
             base_text = contents
+            # Offsets of every newline, so index -> (line, col) is a bisect
+            nl_index = newline_index(base_text)
 
-            def line_col_from_index(idx: int) -> tuple[int, int]:
-                line = base_text.count("\n", 0, idx) + 1
-                last_nl = base_text.rfind("\n", 0, idx)
-                col = (idx - (last_nl + 1)) + \
-                    1 if last_nl >= 0 else idx + 1
-                return line, col
-
+            match_cache: dict[re.Pattern, list[re.Match]] = {}
             at_edits: list[dict[str, Any]] = []
-            for e in text_edits:
-                opx = (e.get("op") or e.get("operation") or e.get(
-                    "type") or e.get("mode") or "").strip().lower()
-                text_field = e.get("text") or e.get("insert") or e.get(
-                    "content") or e.get("replacement") or ""
-                if opx == "anchor_insert":
-                    anchor = e.get("anchor") or ""
-                    position = (e.get("position") or "after").lower()
-                    flags = re.MULTILINE | (
-                        re.IGNORECASE if e.get("ignore_case") else 0)
-                    try:
-                        # Use improved anchor matching logic
-                        m = find_best_anchor_match(
-                            anchor, base_text, flags, prefer_last=True)
-                    except Exception as ex:
-                        return _with_norm(_err("bad_regex", f"Invalid anchor regex: {ex}", normalized=normalized_for_echo, routing="mixed/text-first", extra={"hint": "Escape parentheses/braces or use a simpler anchor."}), normalized_for_echo, routing="mixed/text-first")
-                    if not m:
-                        return _with_norm({"success": False, "code": "anchor_not_found", "message": f"anchor not found: {anchor}"}, normalized_for_echo, routing="mixed/text-first")
-                    idx = m.start() if position == "before" else m.end()
-                    # Normalize insertion to avoid jammed methods
-                    text_field_norm = text_field
-                    if not text_field_norm.startswith("\n"):
-                        text_field_norm = "\n" + text_field_norm
-                    if not text_field_norm.endswith("\n"):
-                        text_field_norm = text_field_norm + "\n"
-                    sl, sc = line_col_from_index(idx)
-                    at_edits.append(
-                        {"startLine": sl, "startCol": sc, "endLine": sl, "endCol": sc, "newText": text_field_norm})
-                    # do not mutate base_text when building atomic spans
-                elif opx == "replace_range":
-                    if all(k in e for k in ("startLine", "startCol", "endLine", "endCol")):
-                        at_edits.append({
-                            "startLine": int(e.get("startLine", 1)),
-                            "startCol": int(e.get("startCol", 1)),
-                            "endLine": int(e.get("endLine", 1)),
-                            "endCol": int(e.get("endCol", 1)),
-                            "newText": text_field
-                        })
-                    else:
-                        return _with_norm(_err("missing_field", "replace_range requires startLine/startCol/endLine/endCol", normalized=normalized_for_echo, routing="mixed/text-first"), normalized_for_echo, routing="mixed/text-first")
-                elif opx == "regex_replace":
-                    pattern = e.get("pattern") or ""
-                    try:
-                        regex_obj = re.compile(pattern, re.MULTILINE | (
-                            re.IGNORECASE if e.get("ignore_case") else 0))
-                    except Exception as ex:
-                        return _with_norm(_err("bad_regex", f"Invalid regex pattern: {ex}", normalized=normalized_for_echo, routing="mixed/text-first", extra={"hint": "Escape special chars or prefer structured delete for methods."}), normalized_for_echo, routing="mixed/text-first")
-                    m = regex_obj.search(base_text)
-                    if not m:
-                        continue
-                    # Expand $1, $2... in replacement using this match
-
-                    def _expand_dollars(rep: str, _m=m) -> str:
-                        return re.sub(r"\$(\d+)", lambda g: _m.group(int(g.group(1))) or "", rep)
-                    repl = _expand_dollars(text_field)
-                    sl, sc = line_col_from_index(m.start())
-                    el, ec = line_col_from_index(m.end())
-                    at_edits.append(
-                        {"startLine": sl, "startCol": sc, "endLine": el, "endCol": ec, "newText": repl})
-                    # do not mutate base_text when building atomic spans
-                elif opx in ("prepend", "append"):
-                    if opx == "prepend":
-                        sl, sc = 1, 1
-                        at_edits.append(
-                            {"startLine": sl, "startCol": sc, "endLine": sl, "endCol": sc, "newText": text_field})
-                        # prepend can be applied atomically without local mutation
-                    else:
-                        # Insert at true EOF position (handles both \n and \r\n correctly)
-                        eof_idx = len(base_text)
-                        sl, sc = line_col_from_index(eof_idx)
-                        new_text = ("\n" if not base_text.endswith(
-                            "\n") else "") + text_field
-                        at_edits.append(
-                            {"startLine": sl, "startCol": sc, "endLine": sl, "endCol": sc, "newText": new_text})
-                        # do not mutate base_text when building atomic spans
-                else:
-                    return _with_norm(_err("unknown_op", f"Unsupported text edit op: {opx}", normalized=normalized_for_echo, routing="mixed/text-first"), normalized_for_echo, routing="mixed/text-first")
-
-            sha = hashlib.sha256(base_text.encode("utf-8")).hexdigest()
+            for i, e in enumerate(edits):
+                if e["op"] not in _TEXT_OPS:
+                    continue
+                span = (_regex_span(e, regexes[i], base_text, nl_index, match_cache, _MIXED_SPAN_RULES)
+                        if i in regexes else
+                        _to_atomic_span(e, base_text, nl_index, match_cache, _MIXED_SPAN_RULES))
+                if span is None:
+                    continue
+                # The first failing edit wins; later edits are not converted
+                if "success" in span:
+                    return _with_norm(span, normalized_for_echo, routing="mixed/text-first")
+                at_edits.append(span)
+
+            sha = _sha256_hex(base_text, raw_contents)
             if at_edits:
-                params_text: dict[str, Any] = {
-                    "action": "apply_text_edits",
-                    "name": name,
-                    "path": path,
-                    "namespace": namespace,
-                    "scriptType": script_type,
-                    "edits": at_edits,
-                    "precondition_sha256": sha,
-                    "options": {"refresh": (options or {}).get("refresh", "debounced"), "validate": (options or {}).get("validate", "standard"), "applyMode": ("atomic" if len(at_edits) > 1 else (options or {}).get("applyMode", "sequential"))}
-                }
+                params_text = _build_apply_params(
+                    action="apply_text_edits", name=name, path=path, namespace=namespace,
+                    script_type=script_type, edits=at_edits,
+                    options=_span_options(options, len(at_edits)), sha=sha)
                 resp_text = await send_with_unity_instance(
                     async_send_command_with_retry,
                     unity_instance,
@@ -511,15 +884,9 @@ async def script_apply_edits(
             opts2 = dict(options or {})
             # Prefer debounced background refresh unless explicitly overridden
             opts2.setdefault("refresh", "debounced")
-            params_struct: dict[str, Any] = {
-                "action": "edit",
-                "name": name,
-                "path": path,
-                "namespace": namespace,
-                "scriptType": script_type,
-                "edits": struct_edits,
-                "options": opts2
-            }
+            params_struct = _build_apply_params(
+                action="edit", name=name, path=path, namespace=namespace,
+                script_type=script_type, edits=struct_edits, options=opts2)
             resp_struct = await send_with_unity_instance(
                 async_send_command_with_retry,
                 unity_instance,
@@ -535,123 +902,42 @@ async def script_apply_edits(
     # If the edits are text-ops, prefer sending them to Unity's apply_text_edits with precondition
     # so header guards and validation run on the C# side.
     # Supported conversions: anchor_insert, replace_range, regex_replace (first match only).
-    text_ops = {(e.get("op") or e.get("operation") or e.get("type") or e.get(
-        "mode") or "").strip().lower() for e in (edits or [])}
-    structured_kinds = {"replace_class", "delete_class",
-                        "replace_method", "delete_method", "insert_method", "anchor_insert"}
-    if not text_ops.issubset(structured_kinds):
+    if all_text:
         # Convert to apply_text_edits payload
         try:
             base_text = contents
+            # Offsets of every newline, so index -> (line, col) is a bisect
+            nl_index = newline_index(base_text)
 
-            def line_col_from_index(idx: int) -> tuple[int, int]:
-                # 1-based line/col against base buffer
-                line = base_text.count("\n", 0, idx) + 1
-                last_nl = base_text.rfind("\n", 0, idx)
-                col = (idx - (last_nl + 1)) + \
-                    1 if last_nl >= 0 else idx + 1
-                return line, col
-
+            match_cache: dict[re.Pattern, list[re.Match]] = {}
             at_edits: list[dict[str, Any]] = []
-            for e in edits or []:
-                op = (e.get("op") or e.get("operation") or e.get(
-                    "type") or e.get("mode") or "").strip().lower()
-                # aliasing for text field
-                text_field = e.get("text") or e.get(
-                    "insert") or e.get("content") or ""
-                if op == "anchor_insert":
-                    anchor = e.get("anchor") or ""
-                    position = (e.get("position") or "after").lower()
-                    # Use improved anchor matching logic with helpful errors, honoring ignore_case
-                    try:
-                        flags = re.MULTILINE | (
-                            re.IGNORECASE if e.get("ignore_case") else 0)
-                        m = find_best_anchor_match(
-                            anchor, base_text, flags, prefer_last=True)
-                    except Exception as ex:
-                        return _with_norm(_err("bad_regex", f"Invalid anchor regex: {ex}", normalized=normalized_for_echo, routing="text", extra={"hint": "Escape parentheses/braces or use a simpler anchor."}), normalized_for_echo, routing="text")
-                    if not m:
-                        return _with_norm({"success": False, "code": "anchor_not_found", "message": f"anchor not found: {anchor}"}, normalized_for_echo, routing="text")
-                    idx = m.start() if position == "before" else m.end()
-                    # Normalize insertion newlines
-                    if text_field and not text_field.startswith("\n"):
-                        text_field = "\n" + text_field
-                    if text_field and not text_field.endswith("\n"):
-                        text_field = text_field + "\n"
-                    sl, sc = line_col_from_index(idx)
-                    at_edits.append({
-                        "startLine": sl,
-                        "startCol": sc,
-                        "endLine": sl,
-                        "endCol": sc,
-                        "newText": text_field or ""
-                    })
-                    # Do not mutate base buffer when building an atomic batch
-                elif op == "replace_range":
-                    # Directly forward if already in line/col form
-                    if "startLine" in e:
-                        at_edits.append({
-                            "startLine": int(e.get("startLine", 1)),
-                            "startCol": int(e.get("startCol", 1)),
-                            "endLine": int(e.get("endLine", 1)),
-                            "endCol": int(e.get("endCol", 1)),
-                            "newText": text_field
-                        })
-                    else:
-                        # If only indices provided, skip (we don't support index-based here)
-                        return _with_norm({"success": False, "code": "missing_field", "message": "replace_range requires startLine/startCol/endLine/endCol"}, normalized_for_echo, routing="text")
-                elif op == "regex_replace":
-                    pattern = e.get("pattern") or ""
-                    repl = text_field
-                    flags = re.MULTILINE | (
-                        re.IGNORECASE if e.get("ignore_case") else 0)
-                    # Early compile for clearer error messages
-                    try:
-                        regex_obj = re.compile(pattern, flags)
-                    except Exception as ex:
-                        return _with_norm(_err("bad_regex", f"Invalid regex pattern: {ex}", normalized=normalized_for_echo, routing="text", extra={"hint": "Escape special chars or prefer structured delete for methods."}), normalized_for_echo, routing="text")
-                    # Use smart anchor matching for consistent behavior with anchor_insert
-                    m = find_best_anchor_match(
-                        pattern, base_text, flags, prefer_last=True)
-                    if not m:
-                        continue
-                    # Expand $1, $2... backrefs in replacement using the first match (consistent with mixed-path behavior)
-
-                    def _expand_dollars(rep: str, _m=m) -> str:
-                        return re.sub(r"\$(\d+)", lambda g: _m.group(int(g.group(1))) or "", rep)
-                    repl_expanded = _expand_dollars(repl)
-                    # Let C# side handle validation using Unity's built-in compiler services
-                    sl, sc = line_col_from_index(m.start())
-                    el, ec = line_col_from_index(m.end())
-                    at_edits.append({
-                        "startLine": sl,
-                        "startCol": sc,
-                        "endLine": el,
-                        "endCol": ec,
-                        "newText": repl_expanded
-                    })
-                    # Do not mutate base buffer when building an atomic batch
-                else:
-                    return _with_norm({"success": False, "code": "unsupported_op", "message": f"Unsupported text edit op for server-side apply_text_edits: {op}"}, normalized_for_echo, routing="text")
+            for i, e in enumerate(edits):
+                span = (_regex_span(e, regexes[i], base_text, nl_index, match_cache, _TEXT_SPAN_RULES)
+                        if i in regexes else
+                        _to_atomic_span(e, base_text, nl_index, match_cache, _TEXT_SPAN_RULES))
+                if span is None:
+                    continue
+                # The first failing edit wins; later edits are not converted
+                if "success" in span:
+                    return _with_norm(span, normalized_for_echo, routing="text")
+                at_edits.append(span)
 
             if not at_edits:
                 return _with_norm({"success": False, "code": "no_spans", "message": "No applicable text edit spans computed (anchor not found or zero-length)."}, normalized_for_echo, routing="text")
 
-            sha = hashlib.sha256(base_text.encode("utf-8")).hexdigest()
-            params: dict[str, Any] = {
-                "action": "apply_text_edits",
-                "name": name,
-                "path": path,
-                "namespace": namespace,
-                "scriptType": script_type,
-                "edits": at_edits,
-                "precondition_sha256": sha,
-                "options": {
-                    "refresh": (options or {}).get("refresh", "debounced"),
-                    "validate": (options or {}).get("validate", "standard"),
-                    "applyMode": ("atomic" if len(at_edits) > 1 else (options or {}).get("applyMode", "sequential"))
-                }
-            }
+            if preview:
+                # Apply the exact spans the write would send, so the diff matches what Unity gets
+                try:
+                    preview_text = _apply_spans(base_text, nl_index, at_edits)
+                except ValueError as e:
+                    return _with_norm({"success": False, "code": "preview_failed", "message": f"Preview failed: {e}"}, normalized_for_echo, routing="preview")
+                return _with_norm({"success": True, "message": "Preview only (no write)", "data": {"diff": _unified_diff(base_text, preview_text)}}, normalized_for_echo, routing="preview")
+
+            sha = _sha256_hex(base_text, raw_contents)
+            params = _build_apply_params(
+                action="apply_text_edits", name=name, path=path, namespace=namespace,
+                script_type=script_type, edits=at_edits,
+                options=_span_options(options, len(at_edits)), sha=sha)
             resp = await send_with_unity_instance(
                 async_send_command_with_retry,
                 unity_instance,
@@ -671,17 +957,13 @@ async def script_apply_edits(
 
     # For regex_replace, honor preview consistently: if preview=true, always return diff without writing.
     # If confirm=false (default) and preview not requested, return diff and instruct confirm=true to apply.
-    if "regex_replace" in text_ops and (preview or not (options or {}).get("confirm")):
+    if kinds & _KIND_REGEX and (preview or not (options or {}).get("confirm")):
         try:
             preview_text = apply_edits_locally(contents, edits)
-            import difflib
-            diff = list(difflib.unified_diff(contents.splitlines(
-            ), preview_text.splitlines(), fromfile="before", tofile="after", n=2))
-            if len(diff) > 800:
-                diff = diff[:800] + ["... (diff truncated) ..."]
+            diff = _unified_diff(contents, preview_text, context=2, limit=800)
             if preview:
-                return {"success": True, "message": "Preview only (no write)", "data": {"diff": "\n".join(diff), "normalizedEdits": normalized_for_echo}}
-            return _with_norm({"success": False, "message": "Preview diff; set options.confirm=true to apply.", "data": {"diff": "\n".join(diff)}}, normalized_for_echo, routing="text")
+                return {"success": True, "message": "Preview only (no write)", "data": {"diff": diff, "normalizedEdits": normalized_for_echo}}
+            return _with_norm({"success": False, "message": "Preview diff; set options.confirm=true to apply.", "data": {"diff": diff}}, normalized_for_echo, routing="text")
         except Exception as e:
             return _with_norm({"success": False, "code": "preview_failed", "message": f"Preview failed: {e}"}, normalized_for_echo, routing="text")
     # 2) apply edits locally (only if not text-ops)
@@ -699,16 +981,7 @@ async def script_apply_edits(
         }, normalized_for_echo, routing="text")
 
     if preview:
-        # Produce a compact unified diff limited to small context
-        import difflib
-        a = contents.splitlines()
-        b = new_contents.splitlines()
-        diff = list(difflib.unified_diff(
-            a, b, fromfile="before", tofile="after", n=3))
-        # Limit diff size to keep responses small
-        if len(diff) > 2000:
-            diff = diff[:2000] + ["... (diff truncated) ..."]
-        return {"success": True, "message": "Preview only (no write)", "data": {"diff": "\n".join(diff), "normalizedEdits": normalized_for_echo}}
+        return {"success": True, "message": "Preview only (no write)", "data": {"diff": _unified_diff(contents, new_contents), "normalizedEdits": normalized_for_echo}}
 
     # 3) update to Unity
     # Default refresh/validate for natural usage on text path as well
@@ -719,27 +992,14 @@ async def script_apply_edits(
     # Compute the SHA of the current file contents for the precondition
     old_lines = contents.splitlines(keepends=True)
     end_line = len(old_lines) + 1  # 1-based exclusive end
-    sha = hashlib.sha256(contents.encode("utf-8")).hexdigest()
+    sha = _sha256_hex(contents, raw_contents)
 
     # Apply a whole-file text edit rather than the deprecated 'update' action
-    params = {
-        "action": "apply_text_edits",
-        "name": name,
-        "path": path,
-        "namespace": namespace,
-        "scriptType": script_type,
-        "edits": [
-            {
-                "startLine": 1,
-                "startCol": 1,
-                "endLine": end_line,
-                "endCol": 1,
-                "newText": new_contents,
-            }
-        ],
-        "precondition_sha256": sha,
-        "options": options or {"validate": "standard", "refresh": "debounced"},
-    }
+    params = _build_apply_params(
+        action="apply_text_edits", name=name, path=path, namespace=namespace,
+        script_type=script_type,
+        edits=[{"startLine": 1, "startCol": 1, "endLine": end_line, "endCol": 1, "newText": new_contents}],
+        options=options, sha=sha)
 
     write_resp = await send_with_unity_instance(
         async_send_command_with_retry,
@@ -1,3 +1,6 @@
+import bisect
+from functools import lru_cache
+from itertools import accumulate
 import json
 import re
 import os
@@ -5,17 +8,64 @@ from typing import Any
 from urllib.parse import urlparse, unquote
 import math
 
+from services.tools.newline_index import newline_index
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# $n backreferences in edit replacement strings
+DOLLAR_BACKREF_PATTERN = re.compile(r"\$(\d+)")
+_INF = math.inf
+# Regex flags for edit patterns, without and with ignore_case
+EDIT_FLAGS = re.MULTILINE
+EDIT_FLAGS_NOCASE = re.MULTILINE | re.IGNORECASE
+# A pattern with none of these characters matches only itself
+_REGEX_META = frozenset(".^$*+?{}[]|()\\")
+# Leading whitespace then an object/array opener
+_JSON_START_PATTERN = re.compile(r"\s*[\[{]")
+_LONG_DIGITS_PATTERN = re.compile(r"\d{19}")
+_UNITY_ASSETS_PREFIX = "unity://path/Assets/"
+# Lines that look like a method signature; braces near them are likely method braces
+_METHOD_SIGNATURE_PATTERN = re.compile(r'\b(void|public|private|protected)\s+\w+\s*\(')
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str, flags: int) -> re.Pattern:
+    """re.compile() memoized per (pattern, flags); edit batches often repeat anchors."""
+    return re.compile(pattern, flags)
+
+
+@lru_cache(maxsize=256)
+def _dollar_to_py(repl: str) -> str:
+    """Translate $n backrefs (our input) to Python \\g<n>."""
+    return DOLLAR_BACKREF_PATTERN.sub(r"\\g<\1>", repl)
+
+
+@lru_cache(maxsize=256)
+def _is_closing_brace_pattern(pattern: str) -> bool:
+    """True for anchors that look like they target a closing brace at end of line."""
+    return '}' in pattern and ('$' in pattern or pattern.endswith(r'\s*'))
+
 
 def parse_json_payload(payload: str | Any) -> Any:
     """Helper to robustly parse a potentially stringified JSON payload."""
     if not isinstance(payload, str):
         return payload
     
-    # Check if it looks like JSON structure
-    stripped = payload.strip()
-    if not (stripped.startswith("{") or stripped.startswith("[")):
+    # Check if it looks like JSON structure (without copying via strip())
+    if not _JSON_START_PATTERN.match(payload):
         return payload
 
+    # orjson turns integers past 64 bits into floats; leave long digit runs to json
+    if orjson is not None and not _LONG_DIGITS_PATTERN.search(payload):
+        try:
+            return orjson.loads(payload)
+        except ValueError:
+            # orjson rejects some inputs json accepts (NaN/Infinity); let json decide
+            pass
     try:
         return json.loads(payload)
     except (json.JSONDecodeError, ValueError):
@@ -54,7 +104,11 @@ def coerce_vec3(value: Any, default: list[float] | None = None) -> list[float] |
             vec = [float(parts[0]), float(parts[1]), float(parts[2])]
         except (ValueError, TypeError, IndexError):
             return default
-        return vec if all(math.isfinite(n) for n in vec) else default
+        x, y, z = vec
+        # Chained comparisons are False for NaN and ±inf alike
+        if -_INF < x < _INF and -_INF < y < _INF and -_INF < z < _INF:
+            return vec
+        return default
         
     if isinstance(val, (list, tuple)) and len(val) == 3:
         return _to_vec3(val)
@@ -86,6 +140,15 @@ def split_uri(uri: str) -> tuple[str, str]:
     - plain paths → decode/normalize separators; if they contain an 'Assets' segment,
         return relative to 'Assets'.
     """
+    if uri.startswith(_UNITY_ASSETS_PREFIX):
+        rest = uri[len("unity://path/"):]
+        # Already normalized Assets path: nothing to decode, collapse or strip
+        if ("%" not in rest and "\\" not in rest and "//" not in rest
+                and "/./" not in rest and "/../" not in rest
+                and not rest.endswith(("/", "/.", "/.."))):
+            directory, _, file_name = rest.rpartition("/")
+            return os.path.splitext(file_name)[0], directory
+
     raw_path: str
     if uri.startswith("unity://path/"):
         raw_path = uri[len("unity://path/"):]
@@ -111,10 +174,7 @@ def split_uri(uri: str) -> tuple[str, str]:
     norm = os.path.normpath(raw_path).replace("\\", "/")
 
     # If an 'Assets' segment exists, compute path relative to it (case-insensitive)
-    parts = [p for p in norm.split("/") if p not in ("", ".")]
-    idx = next((i for i, seg in enumerate(parts)
-                if seg.lower() == "assets"), None)
-    assets_rel = "/".join(parts[idx:]) if idx is not None else None
+    assets_rel = _assets_relative(norm)
 
     effective_path = assets_rel if assets_rel else norm
     # For POSIX absolute paths outside Assets, drop the leading '/'
@@ -127,6 +187,25 @@ def split_uri(uri: str) -> tuple[str, str]:
     return name, directory
 
 
+def _assets_relative(norm: str) -> str | None:
+    """``norm`` from its first 'Assets' segment on (any case), or None."""
+    # Unity spells the root 'Assets'; take an exact-case hit unless a
+    # differently-cased segment comes before it
+    padded = f"/{norm}/"
+    i = padded.find("/Assets/")
+    if i >= 0 and "/assets/" not in padded[:i + 1].lower():
+        return norm[i:]
+    if padded.isascii():
+        # Mixed-case root: one scan of a lowercased copy (same offsets for ASCII)
+        i = padded.lower().find("/assets/")
+        return norm[i:] if i >= 0 else None
+    # lower() can change the length of non-ASCII text, so match per segment
+    parts = [p for p in norm.split("/") if p not in ("", ".")]
+    idx = next((i for i, seg in enumerate(parts)
+                if seg.lower() == "assets"), None)
+    return "/".join(parts[idx:]) if idx is not None else None
+
+
 def normalize_script_locator(name: str, path: str) -> tuple[str, str]:
     """Best-effort normalization of script "name" and "path".
 
@@ -151,11 +230,15 @@ def normalize_script_locator(name: str, path: str) -> tuple[str, str]:
         return s
 
     def collapse_duplicate_tail(s: str) -> str:
-        # Collapse trailing "/X.cs/X.cs" to "/X.cs"
-        parts = s.split("/")
-        if len(parts) >= 2 and parts[-1] == parts[-2]:
-            parts = parts[:-1]
-        return "/".join(parts)
+        # Collapse trailing "/X.cs/X.cs" to "/X.cs"; only the last two segments matter
+        i = s.rfind("/")
+        if i < 0:
+            return s
+        tail = s[i + 1:]
+        j = s.rfind("/", 0, i)
+        if i - j - 1 == len(tail) and s.startswith(tail, j + 1):
+            return s[:i]
+        return s
 
     # Prefer a full path if provided in either field
     candidate = ""
@@ -184,8 +267,56 @@ def normalize_script_locator(name: str, path: str) -> tuple[str, str]:
     return base_name, (p or "Assets")
 
 
+def _splice_lines(lines: list[str], start: int, end: int, new_text: str,
+                  offsets: list[int] | None = None) -> None:
+    """Replace text[start:end] with new_text in a keepends line buffer, in place.
+
+    Same result as re-splitting text[:start] + new_text + text[end:], but only
+    the touched lines are rebuilt. One neighbour line on each side is
+    re-split with them so a "\r" + "\n" seam still merges into one line.
+    """
+    if offsets is None:
+        offsets = [0, *accumulate(map(len, lines))]
+    total = offsets[-1]
+    lo = max(bisect.bisect_right(offsets, min(start, end, total)) - 2, 0)
+    hi = min(bisect.bisect_left(offsets, min(max(start, end), total)) + 1, len(lines))
+    base = offsets[lo]
+    chunk = "".join(lines[lo:hi])
+    lines[lo:hi] = (chunk[:start - base] + new_text +
+                    chunk[end - base:]).splitlines(keepends=True)
+
+
+class _EditBuffer:
+    """Text under edit, kept as a string, a keepends line list, or both.
+
+    Line ops (prepend/append/replace_range) splice the line list in place and
+    regex ops need the joined string; each form is rebuilt from the other only
+    when the previous op invalidated it.
+    """
+
+    def __init__(self, text: str):
+        self._text: str | None = text
+        self._lines: list[str] | None = None
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._lines or ())
+        return self._text
+
+    def lines(self) -> list[str]:
+        """The line list, for in-place edits; the string form is treated as stale."""
+        if self._lines is None:
+            self._lines = self.text().splitlines(keepends=True)
+        self._text = None
+        return self._lines
+
+    def set_text(self, text: str) -> None:
+        self._text = text
+        self._lines = None
+
+
 def apply_edits_locally(original_text: str, edits: list[dict[str, Any]]) -> str:
-    text = original_text
+    buf = _EditBuffer(original_text)
     for edit in edits or []:
         op = (
             (edit.get("op")
@@ -205,21 +336,23 @@ def apply_edits_locally(original_text: str, edits: list[dict[str, Any]]) -> str:
 
         if op == "prepend":
             prepend_text = edit.get("text", "")
-            text = (prepend_text if prepend_text.endswith(
-                "\n") else prepend_text + "\n") + text
+            _splice_lines(buf.lines(), 0, 0, prepend_text if prepend_text.endswith(
+                "\n") else prepend_text + "\n")
         elif op == "append":
+            lines = buf.lines()
             append_text = edit.get("text", "")
-            if not text.endswith("\n"):
-                text += "\n"
-            text += append_text
-            if not text.endswith("\n"):
-                text += "\n"
+            ends_with_newline = bool(lines) and lines[-1].endswith("\n")
+            suffix = ("" if ends_with_newline else "\n") + append_text
+            if suffix and not suffix.endswith("\n"):
+                suffix += "\n"
+            end = sum(map(len, lines))
+            _splice_lines(lines, end, end, suffix)
         elif op == "anchor_insert":
+            text = buf.text()
             anchor = edit.get("anchor", "")
             position = (edit.get("position") or "before").lower()
             insert_text = edit.get("text", "")
-            flags = re.MULTILINE | (
-                re.IGNORECASE if edit.get("ignore_case") else 0)
+            flags = EDIT_FLAGS_NOCASE if edit.get("ignore_case") else EDIT_FLAGS
 
             # Find the best match using improved heuristics
             match = find_best_anchor_match(
@@ -229,44 +362,56 @@ def apply_edits_locally(original_text: str, edits: list[dict[str, Any]]) -> str:
                     continue
                 raise RuntimeError(f"anchor not found: {anchor}")
             idx = match.start() if position == "before" else match.end()
-            text = text[:idx] + insert_text + text[idx:]
+            buf.set_text(text[:idx] + insert_text + text[idx:])
         elif op == "replace_range":
+            lines = buf.lines()
             start_line = int(edit.get("startLine", 1))
             start_col = int(edit.get("startCol", 1))
             end_line = int(edit.get("endLine", start_line))
             end_col = int(edit.get("endCol", 1))
             replacement = edit.get("text", "")
-            lines = text.splitlines(keepends=True)
             max_line = len(lines) + 1  # 1-based, exclusive end
             if (start_line < 1 or end_line < start_line or end_line > max_line
                     or start_col < 1 or end_col < 1):
                 raise RuntimeError("replace_range out of bounds")
 
-            def index_of(line: int, col: int, lines_ref: list[str] = lines) -> int:
-                if line <= len(lines_ref):
-                    return sum(len(ln) for ln in lines_ref[: line - 1]) + (col - 1)
-                return sum(len(ln) for ln in lines_ref)
+            # offsets[i] = index where line i+1 starts; offsets[-1] = len(text)
+            offsets = [0, *accumulate(map(len, lines))]
+
+            def index_of(line: int, col: int) -> int:
+                if line <= len(lines):
+                    return offsets[line - 1] + (col - 1)
+                return offsets[-1]
             a = index_of(start_line, start_col)
             b = index_of(end_line, end_col)
-            text = text[:a] + replacement + text[b:]
+            _splice_lines(lines, a, b, replacement, offsets)
         elif op == "regex_replace":
+            text = buf.text()
             pattern = edit.get("pattern", "")
             repl = edit.get("replacement", "")
-            # Translate $n backrefs (our input) to Python \g<n>
-            repl_py = re.sub(r"\$(\d+)", r"\\g<\1>", repl)
             count = int(edit.get("count", 0))  # 0 = replace all
-            flags = re.MULTILINE
-            if edit.get("ignore_case"):
-                flags |= re.IGNORECASE
-            text = re.sub(pattern, repl_py, text, count=count, flags=flags)
+            if (count >= 0 and not edit.get("ignore_case") and _REGEX_META.isdisjoint(pattern)
+                    and "$" not in repl and "\\" not in repl):
+                # Plain text in, plain text out: str.replace, no regex engine
+                if pattern in text:
+                    buf.set_text(text.replace(pattern, repl, count or -1))
+            else:
+                flags = EDIT_FLAGS_NOCASE if edit.get("ignore_case") else EDIT_FLAGS
+                new_text, replaced = compile_pattern(pattern, flags).subn(
+                    _dollar_to_py(repl), text, count=count)
+                # No match: keep the current text and any line buffer built from it
+                if replaced:
+                    buf.set_text(new_text)
         else:
             allowed = "anchor_insert, prepend, append, replace_range, regex_replace"
             raise RuntimeError(
                 f"unknown edit op: {op}; allowed: {allowed}. Use 'op' (aliases accepted: type/mode/operation).")
-    return text
+    return buf.text()
 
 
-def find_best_anchor_match(pattern: str, text: str, flags: int, prefer_last: bool = True):
+def find_best_anchor_match(pattern: str | re.Pattern, text: str, flags: int, prefer_last: bool = True,
+                           matches: list[re.Match] | None = None,
+                           newlines: list[int] | None = None):
     """
     Find the best anchor match using improved heuristics.
 
@@ -278,17 +423,26 @@ def find_best_anchor_match(pattern: str, text: str, flags: int, prefer_last: boo
     3. Consider context to avoid matches inside strings/comments
 
     Args:
-        pattern: Regex pattern to search for
+        pattern: Regex pattern to search for, or an already compiled pattern
         text: Text to search in  
-        flags: Regex flags
+        flags: Regex flags (ignored when pattern is already compiled)
         prefer_last: If True, prefer the last match over the first
+        matches: All matches of pattern in text, if the caller already has them
+        newlines: Offsets of every newline in text, if the caller already has them
 
     Returns:
         Match object of the best match, or None if no match found
     """
 
+    if isinstance(pattern, re.Pattern):
+        regex = pattern
+        pattern = regex.pattern
+    else:
+        regex = compile_pattern(pattern, flags)
+
     # Find all matches
-    matches = list(re.finditer(pattern, text, flags))
+    if matches is None:
+        matches = list(regex.finditer(text))
     if not matches:
         return None
 
@@ -297,18 +451,15 @@ def find_best_anchor_match(pattern: str, text: str, flags: int, prefer_last: boo
         return matches[0]
 
     # For patterns that look like they're trying to match closing braces at end of lines
-    is_closing_brace_pattern = '}' in pattern and (
-        '$' in pattern or pattern.endswith(r'\s*'))
-
-    if is_closing_brace_pattern and prefer_last:
+    if prefer_last and _is_closing_brace_pattern(pattern):
         # Use heuristics to find the best closing brace match
-        return _find_best_closing_brace_match(matches, text)
+        return _find_best_closing_brace_match(matches, text, newlines)
 
     # Default behavior: use last match if prefer_last, otherwise first match
     return matches[-1] if prefer_last else matches[0]
 
 
-def _find_best_closing_brace_match(matches, text: str):
+def _find_best_closing_brace_match(matches, text: str, newlines: list[int] | None = None):
     """
     Find the best closing brace match using C# structure heuristics.
 
@@ -322,6 +473,7 @@ def _find_best_closing_brace_match(matches, text: str):
     Args:
         matches: List of regex match objects
         text: The full text being searched
+        newlines: Offsets of every newline in text; scanned here when omitted
 
     Returns:
         The best match object
@@ -331,20 +483,24 @@ def _find_best_closing_brace_match(matches, text: str):
 
     scored_matches = []
     lines = text.splitlines()
+    # Per-line facts shared by every match
+    indentations = [len(ln) - len(ln.lstrip()) for ln in lines]
+    method_flags = [1 if _METHOD_SIGNATURE_PATTERN.search(ln) else 0 for ln in lines]
+
+    # A match's line is the number of newlines before it
+    if newlines is None:
+        newlines = newline_index(text)
 
     for match in matches:
         score = 0
         start_pos = match.start()
 
-        # Find which line this match is on
-        lines_before = text[:start_pos].count('\n')
-        line_num = lines_before
+        # Find which line this match is on (0-based)
+        line_num = bisect.bisect_left(newlines, start_pos)
 
         if line_num < len(lines):
-            line_content = lines[line_num]
-
-            # Calculate indentation level (lower is better for class braces)
-            indentation = len(line_content) - len(line_content.lstrip())
+            # Indentation level (lower is better for class braces)
+            indentation = indentations[line_num]
 
             # Prefer lower indentation (class braces are typically less indented than method braces)
             # Max 20 points for indentation=0
@@ -358,12 +514,9 @@ def _find_best_closing_brace_match(matches, text: str):
             # Look at surrounding context to avoid method braces
             context_start = max(0, line_num - 3)
             context_end = min(len(lines), line_num + 2)
-            context_lines = lines[context_start:context_end]
 
             # Penalize if this looks like it's inside a method (has method-like patterns above)
-            for context_line in context_lines:
-                if re.search(r'\b(void|public|private|protected)\s+\w+\s*\(', context_line):
-                    score -= 5  # Penalty for being near method signatures
+            score -= 5 * sum(method_flags[context_start:context_end])
 
             # Bonus if this looks like a class-ending brace (very minimal indentation and near EOF)
             if indentation <= 4 and distance_from_end <= 3:
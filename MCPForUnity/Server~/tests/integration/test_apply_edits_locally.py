@@ -0,0 +1,102 @@
+"""
+Tests for the local edit helpers in services.tools.utils.
+"""
+
+import services.tools.utils as utils_module
+
+
+SOURCE = """using UnityEngine;
+
+public class Foo : MonoBehaviour
+{
+    int count = 1;
+
+    void Start()
+    {
+        Debug.Log(count);
+    }
+}
+"""
+
+
+def test_regex_replace_expands_dollar_backrefs():
+    edits = [{"op": "regex_replace", "pattern": r"Debug\.Log\((\w+)\)",
+              "replacement": "Debug.LogWarning($1)"}]
+
+    out = utils_module.apply_edits_locally(SOURCE, edits)
+
+    assert "Debug.LogWarning(count);" in out
+
+
+def test_repeated_patterns_compile_once():
+    utils_module.compile_pattern.cache_clear()
+    edits = [{"op": "regex_replace", "pattern": r"count\b", "replacement": "n", "count": 1}] * 3
+
+    utils_module.apply_edits_locally(SOURCE, edits)
+
+    info = utils_module.compile_pattern.cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+
+
+def test_literal_regex_replace_skips_the_regex_engine():
+    utils_module.compile_pattern.cache_clear()
+    edits = [{"op": "regex_replace", "pattern": "count", "replacement": "n", "count": 1},
+             {"op": "regex_replace", "pattern": "Foo", "replacement": "Bar"}]
+
+    out = utils_module.apply_edits_locally(SOURCE, edits)
+
+    assert "int n = 1;" in out and "Debug.Log(count);" in out
+    assert "public class Bar" in out
+    assert utils_module.compile_pattern.cache_info().misses == 0
+
+
+def test_literal_pattern_with_backslash_replacement_uses_regex_rules():
+    edits = [{"op": "regex_replace", "pattern": "count = 1", "replacement": r"count =\t2"}]
+
+    out = utils_module.apply_edits_locally(SOURCE, edits)
+
+    assert "int count =\t2;" in out
+
+
+def test_replace_range_maps_line_and_column_to_offsets():
+    edits = [
+        {"op": "replace_range", "startLine": 5, "startCol": 17,
+         "endLine": 5, "endCol": 18, "text": "42"},
+        {"op": "replace_range", "startLine": 12, "startCol": 1,
+         "endLine": 12, "endCol": 1, "text": "// eof\n"},
+    ]
+
+    out = utils_module.apply_edits_locally(SOURCE, edits)
+
+    assert "    int count = 42;\n" in out
+    assert out.endswith("}\n// eof\n")
+
+
+def test_line_and_regex_ops_compose_in_order():
+    edits = [
+        {"op": "prepend", "text": "// header"},
+        {"op": "replace_range", "startLine": 6, "startCol": 17,
+         "endLine": 6, "endCol": 18, "text": "2"},
+        {"op": "regex_replace", "pattern": r"count", "replacement": "total"},
+        {"op": "append", "text": "// footer"},
+        {"op": "replace_range", "startLine": 1, "startCol": 4,
+         "endLine": 1, "endCol": 10, "text": "top"},
+    ]
+
+    out = utils_module.apply_edits_locally(SOURCE, edits)
+
+    assert out.startswith("// top\nusing UnityEngine;\n")
+    assert "    int total = 2;\n" in out
+    assert "Debug.Log(total);" in out
+    assert out.endswith("}\n// footer\n")
+
+
+def test_replace_range_keeps_crlf_seams_intact():
+    text = "a\r\nb\r\nc\r\n"
+    edits = [{"op": "replace_range", "startLine": 2, "startCol": 1,
+              "endLine": 2, "endCol": 2, "text": "\n"}]
+
+    out = utils_module.apply_edits_locally(text, edits)
+
+    assert out == "a\r\n\n\r\nc\r\n"
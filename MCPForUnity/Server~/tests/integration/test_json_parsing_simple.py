@@ -3,8 +3,12 @@ Simple tests for JSON string parameter parsing logic.
 Tests the core JSON parsing functionality without MCP server dependencies.
 """
 import json
+import math
+
 import pytest
 
+from services.tools.utils import parse_json_payload
+
 
 def parse_properties_json(properties):
     """
@@ -109,5 +113,24 @@ class TestJsonParsingLogic:
             assert result == malformed_json
 
 
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        ('{"a": [1, 2.5, "x"]}', {"a": [1, 2.5, "x"]}),
+        ("[123456789012345678901234567890]", [123456789012345678901234567890]),
+        ('{"a": NaN}', None),
+        ("{not json", "{not json"),
+    ],
+)
+def test_parse_json_payload_matches_stdlib(payload, expected):
+    result = parse_json_payload(payload)
+    if expected is None:
+        assert math.isnan(result["a"])
+    else:
+        assert result == expected
+        assert type(result[0] if isinstance(result, list) else result) is type(
+            expected[0] if isinstance(expected, list) else expected)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,117 @@
+import logging
+
+import pytest
+
+import core.logging_setup as logging_setup
+from core.config import ServerConfig
+from core.logging_setup import BufferedRotatingFileHandler
+
+
+@pytest.fixture
+def isolated_logging(tmp_path, monkeypatch):
+    """Run setup_logging() against a temp log dir and restore logger state after."""
+    monkeypatch.setattr(logging_setup, "_LOG_DIR", tmp_path / "Logs")
+    names = (logging_setup.SERVER_LOGGER_NAME, logging_setup.TELEMETRY_LOGGER_NAME,
+             *logging_setup.NOISY_LOGGER_NAMES, *logging_setup.STDIO_LOGGER_NAMES)
+    root = logging.getLogger()
+    # Detach root's handlers so basicConfig(force=True) cannot close them
+    saved_root = (root.level, list(root.handlers))
+    root.handlers.clear()
+    saved = {n: (logging.getLogger(n).level, logging.getLogger(n).propagate) for n in names}
+    logging_setup._reset_logging()
+    yield tmp_path
+    logging_setup._reset_logging()
+    for handler in root.handlers:
+        handler.close()
+    root.setLevel(saved_root[0])
+    root.handlers[:] = saved_root[1]
+    for n, (level, propagate) in saved.items():
+        logging.getLogger(n).setLevel(level)
+        logging.getLogger(n).propagate = propagate
+
+
+def _record(msg: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, msg, None, None)
+
+
+def test_buffered_handler_defers_info_until_flush(tmp_path):
+    path = tmp_path / "server.log"
+    handler = BufferedRotatingFileHandler(
+        str(path), maxBytes=0, backupCount=1, encoding="utf-8", flush_interval=3600)
+    try:
+        handler.handle(_record("buffered line"))
+        assert path.read_text(encoding="utf-8") == ""
+        handler.flush()
+        assert path.read_text(encoding="utf-8") == "buffered line\n"
+    finally:
+        handler.close()
+
+
+def test_buffered_handler_flushes_errors_immediately(tmp_path):
+    path = tmp_path / "server.log"
+    handler = BufferedRotatingFileHandler(
+        str(path), maxBytes=0, backupCount=1, encoding="utf-8", flush_interval=3600)
+    try:
+        handler.handle(_record("info line"))
+        handler.handle(_record("error line", logging.ERROR))
+        assert path.read_text(encoding="utf-8") == "info line\nerror line\n"
+    finally:
+        handler.close()
+
+
+def test_buffered_handler_rolls_over_on_byte_count(tmp_path):
+    path = tmp_path / "server.log"
+    handler = BufferedRotatingFileHandler(
+        str(path), maxBytes=64, backupCount=2, encoding="utf-8", flush_interval=3600)
+    try:
+        for i in range(9):
+            handler.handle(_record(f"line {i:02d} " + "x" * 12))
+        handler.flush()
+    finally:
+        handler.close()
+    # Backup shuffles run on the rotation worker; wait for it to drain
+    BufferedRotatingFileHandler._rotation_executor.submit(lambda: None).result()
+
+    assert (tmp_path / "server.log.1").exists()
+    assert (tmp_path / "server.log.2").exists()
+    assert not list(tmp_path.glob("*.pending-*"))
+    for p in tmp_path.iterdir():
+        assert p.stat().st_size < 64
+    assert "line 08" in path.read_text(encoding="utf-8")
+
+
+def test_buffered_handler_without_backups_never_rolls_over(tmp_path):
+    path = tmp_path / "server.log"
+    handler = BufferedRotatingFileHandler(
+        str(path), maxBytes=64, backupCount=0, encoding="utf-8", flush_interval=3600)
+    try:
+        stream = handler.stream
+        for i in range(9):
+            handler.handle(_record(f"line {i:02d} " + "x" * 12))
+        # Past maxBytes the file stays open instead of being reopened per record
+        assert handler.stream is stream
+        handler.flush()
+    finally:
+        handler.close()
+
+    assert [p.name for p in tmp_path.iterdir()] == ["server.log"]
+    assert path.read_text(encoding="utf-8").count("\n") == 9
+
+
+def test_setup_logging_is_idempotent(isolated_logging):
+    config = ServerConfig()
+    first = logging_setup.setup_logging(config)
+    second = logging_setup.setup_logging(config)
+
+    assert first is not None and first is second
+    assert (isolated_logging / "Logs" / logging_setup.LOG_FILE_NAME).exists()
+    server_logger = logging.getLogger(logging_setup.SERVER_LOGGER_NAME)
+    assert server_logger.handlers.count(first) == 1
+
+
+def test_setup_logging_skips_file_when_disabled(isolated_logging, monkeypatch):
+    monkeypatch.setenv("MCP_DISABLE_FILE_LOG", "1")
+
+    assert logging_setup.setup_logging(ServerConfig()) is None
+    assert logging_setup._file_handler is None
+    assert not list(isolated_logging.rglob("*.log"))
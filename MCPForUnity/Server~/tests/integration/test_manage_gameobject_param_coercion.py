@@ -34,3 +34,21 @@ async def test_manage_gameobject_boolean_and_tag_mapping(monkeypatch):
     assert captured["params"]["searchTerm"] == "Player"
     assert captured["params"]["findAll"] == "true" or captured["params"]["findAll"] is True
     assert captured["params"]["searchInactive"] in ("0", False, 0)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ([1, 2, 3], [1.0, 2.0, 3.0]),
+        ("1, 2.5, -3", [1.0, 2.5, -3.0]),
+        ("[0 0 1]", [0.0, 0.0, 1.0]),
+        ([1, float("nan"), 3], None),
+        ("inf, 0, 0", None),
+        ([0, 0, float("-inf")], None),
+        ([1, 2], None),
+    ],
+)
+def test_coerce_vec3_rejects_non_finite(value, expected):
+    from services.tools.utils import coerce_vec3
+
+    assert coerce_vec3(value) == expected
@@ -123,3 +123,37 @@ async def test_split_uri_plain_path(monkeypatch):
 
     assert captured['params']['name'] == 'Thing'
     assert captured['params']['path'] == 'Assets/Scripts'
+
+
+@pytest.mark.parametrize(
+    "uri, expected",
+    [
+        ("unity://path/Assets/Scripts/MyScript.cs", ("MyScript", "Assets/Scripts")),
+        ("unity://path/Assets/MyScript.cs", ("MyScript", "Assets")),
+        ("unity://path/Assets/Scripts/../Editor/Tool.cs", ("Tool", "Assets/Editor")),
+        ("unity://path/Assets/My%20Scripts/A.cs", ("A", "Assets/My Scripts")),
+        ("unity://path/Assets//Scripts/./B.cs", ("B", "Assets/Scripts")),
+        ("unity://path/Assets/Scripts/", ("Scripts", "Assets")),
+        ("file:///proj/assets/Plugins/Assets/C.cs", ("C", "assets/Plugins/Assets")),
+        ("file:///proj/ASSETS/D.cs", ("D", "ASSETS")),
+    ],
+)
+def test_split_uri_unity_paths(uri, expected):
+    from services.tools.utils import split_uri
+
+    assert split_uri(uri) == expected
+
+
+@pytest.mark.parametrize(
+    "name, path, expected",
+    [
+        ("SmartReach", "Assets/Scripts/Interaction", ("SmartReach", "Assets/Scripts/Interaction")),
+        ("Assets/Scripts/SmartReach.cs/SmartReach.cs", "", ("SmartReach", "Assets/Scripts")),
+        ("", "unity://path/Assets/A.cs/A.cs", ("A", "Assets")),
+        ("", "Assets/B.cs/C.cs", ("C", "Assets/B.cs")),
+    ],
+)
+def test_normalize_script_locator_collapses_duplicate_tail(name, path, expected):
+    from services.tools.utils import normalize_script_locator
+
+    assert normalize_script_locator(name, path) == expected
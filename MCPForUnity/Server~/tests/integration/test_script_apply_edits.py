@@ -0,0 +1,519 @@
+import base64
+import difflib
+import hashlib
+import random
+import re
+
+import pytest
+
+import services.tools.script_apply_edits as sae
+import services.tools.utils as utils_module
+from services.tools.newline_index import newline_index
+from .test_helpers import DummyContext
+
+
+SOURCE = """using UnityEngine;
+
+public class Foo : MonoBehaviour
+{
+    int count = 1;
+
+    void Start()
+    {
+        Debug.Log(count);
+    }
+}
+"""
+
+
+def _install_fake_unity(monkeypatch, contents=SOURCE, encoded=False):
+    calls = []
+    if encoded:
+        read_data = {"contentsEncoded": True, "encodedContents": base64.b64encode(
+            contents.encode("utf-8")).decode("ascii")}
+    else:
+        read_data = {"contents": contents}
+
+    async def fake_send(cmd, params, **kwargs):
+        calls.append(params)
+        if params.get("action") == "read":
+            return {"success": True, "data": read_data}
+        return {"success": True}
+
+    monkeypatch.setattr(sae, "async_send_command_with_retry", fake_send)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_regex_replace_routes_to_apply_text_edits(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "regex_replace", "pattern": r"count = (\d+)", "text": "count = $1$1"}],
+    )
+
+    assert resp["success"] is True
+    assert resp["data"]["routing"] == "text"
+    params = calls[-1]
+    assert params["action"] == "apply_text_edits"
+    assert params["precondition_sha256"] == hashlib.sha256(
+        SOURCE.encode("utf-8")).hexdigest()
+    assert params["edits"] == [{
+        "startLine": 5, "startCol": 9, "endLine": 5, "endCol": 18, "newText": "count = 11",
+    }]
+
+
+@pytest.mark.asyncio
+async def test_encoded_read_hashes_decoded_bytes(monkeypatch):
+    source = SOURCE.replace("Debug.Log(count);", "Debug.Log(\"é\");")
+    calls = _install_fake_unity(monkeypatch, source, encoded=True)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "regex_replace", "pattern": r"count = 1", "text": "count = 2"}],
+    )
+
+    assert resp["success"] is True
+    assert calls[-1]["precondition_sha256"] == hashlib.sha256(
+        source.encode("utf-8")).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_mixed_batch_applies_text_then_structured(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[
+            {"op": "append", "text": "// tail\n"},
+            {"op": "regex_replace", "pattern": r"Debug\.Log\((\w+)\)",
+             "text": "Debug.LogWarning($1)"},
+            {"op": "delete_method", "methodName": "Start"},
+        ],
+    )
+
+    assert resp["success"] is True
+    assert resp["data"]["routing"] == "mixed/text-first"
+    text_call, struct_call = calls[-2], calls[-1]
+    assert text_call["action"] == "apply_text_edits"
+    assert text_call["edits"] == [
+        {"startLine": 12, "startCol": 1, "endLine": 12,
+            "endCol": 1, "newText": "// tail\n"},
+        {"startLine": 9, "startCol": 9, "endLine": 9,
+            "endCol": 25, "newText": "Debug.LogWarning(count)"},
+    ]
+    assert text_call["options"]["applyMode"] == "atomic"
+    assert struct_call["action"] == "edit"
+    assert [e["op"] for e in struct_call["edits"]] == ["delete_method"]
+
+
+@pytest.mark.asyncio
+async def test_bad_regex_reports_error(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[
+            {"op": "regex_replace", "pattern": "(unclosed", "text": "x"},
+            {"op": "regex_replace", "pattern": "count", "text": "n"},
+            {"op": "regex_replace", "pattern": "[oops", "text": "y"},
+        ],
+    )
+
+    assert resp["success"] is False
+    assert resp["code"] == "bad_regex"
+    assert resp["data"]["badEdits"] == [0, 2]
+    # Rejected before reading the script from Unity
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_repeated_patterns_reuse_compiled_regex(monkeypatch):
+    _install_fake_unity(monkeypatch)
+    # One regex cache shared with apply_edits_locally
+    utils_module.compile_pattern.cache_clear()
+    edits = [{"op": "regex_replace", "pattern": r"count = (\d+)", "text": "count = 2"}]
+
+    for _ in range(3):
+        await sae.script_apply_edits(
+            DummyContext(), name="Foo", path="Assets/Scripts", edits=edits)
+
+    info = utils_module.compile_pattern.cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_op_aliases_are_folded_into_op(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"mode": " Delete_Method ", "methodName": "Start"}],
+    )
+
+    assert resp["data"]["routing"] == "structured"
+    sent = calls[-1]["edits"][0]
+    assert sent["op"] == "delete_method"
+    assert "mode" not in sent
+
+
+def test_canonical_edits_are_not_copied():
+    edit = {"op": "delete_method", "className": "Foo", "methodName": "Start"}
+    aliased = {"op": "delete_method", "class": "Foo", "method": "Start"}
+
+    assert sae._unwrap_and_alias(edit) is edit
+    normalized = sae._unwrap_and_alias(aliased)
+    assert normalized is not aliased
+    assert normalized == edit
+
+
+def test_normalizing_never_writes_into_caller_edits():
+    raw = [{"op": "regex_delete", "pattern": "x"},
+           {"op": "replace_method", "methodName": "Start", "replacement": "void Start(){}"}]
+    before = [dict(e) for e in raw]
+
+    edits, _ = sae._normalize_edits(raw, "Foo")
+
+    assert raw == before
+    assert edits[0] == {"op": "regex_replace", "pattern": "x", "text": ""}
+    assert edits[1]["className"] == "Foo"
+
+
+@pytest.mark.asyncio
+async def test_missing_field_echoes_every_normalized_edit(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "delete_method"}, {"type": "regex_delete", "pattern": "x"}],
+    )
+
+    assert resp["success"] is False
+    assert resp["code"] == "missing_field"
+    assert [e["op"] for e in resp["data"]["normalizedEdits"]] == [
+        "delete_method", "regex_replace"]
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_regex_replacement_keeps_literal_backslashes(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "regex_replace", "pattern": r"Debug\.Log\((\w+)\)",
+                "text": r'Debug.Log("\n" + $1)'}],
+    )
+
+    assert calls[-1]["edits"][0]["newText"] == r'Debug.Log("\n" + count)'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("edits", [
+    # Mixed route: replace_range needs all four coordinates
+    [{"op": "text_replace", "startLine": 1, "text": ""},
+     {"op": "regex_delete", "pattern": "count", "text": "$1"},
+     {"op": "delete_method", "className": "Foo", "methodName": "Start"}],
+    # Text-only route: replace_range needs startLine
+    [{"op": "replace_range", "text": ""},
+     {"op": "regex_replace", "pattern": "count", "text": "$1"}],
+])
+async def test_first_failing_edit_is_reported(monkeypatch, edits):
+    calls = _install_fake_unity(monkeypatch)
+
+    # The second edit would raise (no group 1); it must not mask the first error
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts", edits=edits)
+
+    assert resp["code"] == "missing_field"
+    assert resp["message"] == "replace_range requires startLine/startCol/endLine/endCol"
+    assert [c["action"] for c in calls] == ["read"]
+
+
+@pytest.mark.asyncio
+async def test_text_route_reads_span_text_from_text_fields_only(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    # 'replacement' is not span text on the text-only route, so $1 is never expanded
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "regex_replace", "pattern": r"count", "replacement": "$1"}],
+    )
+
+    assert resp["success"] is True
+    assert calls[-1]["edits"][0]["newText"] == ""
+
+
+@pytest.mark.asyncio
+async def test_text_route_rejects_prepend_and_append(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "prepend", "text": "// header\n"}],
+    )
+
+    assert resp["code"] == "unsupported_op"
+    assert [c["action"] for c in calls] == ["read"]
+
+
+@pytest.mark.asyncio
+async def test_mixed_route_converts_append_with_replacement_text(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "append", "replacement": "// tail\n"},
+               {"op": "delete_method", "className": "Foo", "methodName": "Start"}],
+    )
+
+    assert resp["success"] is True
+    assert calls[1]["edits"] == [
+        {"startLine": 12, "startCol": 1, "endLine": 12, "endCol": 1, "newText": "// tail\n"}]
+
+
+@pytest.mark.asyncio
+async def test_text_route_replace_range_defaults_missing_coordinates(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "replace_range", "startLine": 1, "endLine": 2, "text": "// header\n"}],
+    )
+
+    assert resp["success"] is True
+    assert calls[-1]["edits"] == [
+        {"startLine": 1, "startCol": 1, "endLine": 2, "endCol": 1, "newText": "// header\n"}]
+
+
+@pytest.mark.asyncio
+async def test_mixed_route_replace_range_requires_every_coordinate(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "replace_range", "startLine": 1, "text": "x"},
+               {"op": "delete_method", "methodName": "Start"}],
+    )
+
+    assert resp["success"] is False
+    assert resp["code"] == "missing_field"
+    assert [c["action"] for c in calls] == ["read"]
+
+
+@pytest.mark.asyncio
+async def test_preview_of_text_edits_skips_the_write(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+
+    resp = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts",
+        edits=[{"op": "regex_replace", "pattern": r"count = 1", "text": "count = 2"}],
+        options={"preview": True},
+    )
+
+    assert resp["success"] is True
+    assert resp["data"]["routing"] == "preview"
+    assert "+    int count = 2;" in resp["data"]["diff"]
+    assert [c["action"] for c in calls] == ["read"]
+
+
+@pytest.mark.asyncio
+async def test_preview_shows_the_spans_the_write_sends(monkeypatch):
+    calls = _install_fake_unity(monkeypatch)
+    # "count" matches twice; the text route rewrites only the best match
+    edits = [{"op": "regex_replace", "pattern": r"count", "text": "n"}]
+
+    preview = await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts", edits=edits,
+        options={"preview": True})
+    await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts", edits=edits)
+
+    written = sae._apply_spans(SOURCE, newline_index(SOURCE), calls[-1]["edits"])
+    assert preview["data"]["diff"] == sae._unified_diff(SOURCE, written)
+    assert "+        Debug.Log(n);" in preview["data"]["diff"]
+    assert "int count = 1;" in written
+
+
+def _unity_index(text, line1, col1):
+    # Port of ManageScript.TryIndexFromLineCol
+    line = col = 1
+    i = 0
+    while i <= len(text):
+        if line == line1 and col == col1:
+            return i
+        if i == len(text):
+            break
+        c = text[i]
+        if c == "\r":
+            if i + 1 < len(text) and text[i + 1] == "\n":
+                i += 1
+            line, col = line + 1, 1
+        elif c == "\n":
+            line, col = line + 1, 1
+        else:
+            col += 1
+        i += 1
+    return None
+
+
+@pytest.mark.parametrize("text", ["a\nbc\n", "a\r\nbc\r\n", "a\rbc\rd", "a\r\rb\n\r\nc", "\r", ""])
+def test_span_index_follows_unity_line_breaks(text):
+    line_ends = sae._line_ends(text, newline_index(text))
+    for line in range(1, 7):
+        for col in range(1, 6):
+            expected = _unity_index(text, line, col)
+            if expected is None:
+                with pytest.raises(ValueError):
+                    sae._span_index(text, line_ends, line, col)
+            else:
+                assert sae._span_index(text, line_ends, line, col) == expected
+
+
+def test_apply_spans_rejects_overlaps():
+    spans = [{"startLine": 5, "startCol": 1, "endLine": 5, "endCol": 10, "newText": "a"},
+             {"startLine": 5, "startCol": 5, "endLine": 6, "endCol": 1, "newText": "b"}]
+
+    with pytest.raises(ValueError):
+        sae._apply_spans(SOURCE, newline_index(SOURCE), spans)
+
+
+@pytest.mark.asyncio
+async def test_shared_pattern_is_scanned_once_per_batch(monkeypatch):
+    _install_fake_unity(monkeypatch)
+    seen = []
+    real = sae.find_best_anchor_match
+
+    def spy(*args, matches=None, **kwargs):
+        seen.append(matches)
+        return real(*args, matches=matches, **kwargs)
+
+    monkeypatch.setattr(sae, "find_best_anchor_match", spy)
+    edit = {"op": "regex_replace", "pattern": r"count", "text": "n"}
+
+    await sae.script_apply_edits(
+        DummyContext(), name="Foo", path="Assets/Scripts", edits=[edit, dict(edit)])
+
+    assert len(seen) == 2
+    assert seen[0] is seen[1]
+
+
+def test_closing_brace_scoring_reuses_caller_newline_index():
+    matches = list(utils_module.compile_pattern(r"^\s*}\s*$", re.MULTILINE).finditer(SOURCE))
+    expected = sae.find_best_anchor_match(r"^\s*}\s*$", SOURCE, re.MULTILINE)
+
+    m = sae.find_best_anchor_match(r"^\s*}\s*$", SOURCE, re.MULTILINE,
+                                   matches=matches, newlines=newline_index(SOURCE))
+
+    assert len(matches) == 2
+    assert m is not None and expected is not None
+    assert m.span() == expected.span() == matches[-1].span()
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "no newline",
+    "a\nb\r\nc\n",
+    "ünïcode\nline\n",
+    "x" * 70_000 + "\n" + "y\n" * 10,
+])
+def test_newline_index_lists_every_newline(text):
+    assert newline_index(text) == [i for i, ch in enumerate(text) if ch == "\n"]
+
+
+def test_numba_newline_scan_handles_large_ascii_text():
+    pytest.importorskip("numba")
+    import services.tools.newline_index as nli
+    text = ("x" * 99 + "\n") * 1000
+    assert len(text) > nli.NUMBA_MIN_CHARS and nli._numba_scanner() is not None
+
+    assert newline_index(text) == list(range(99, len(text), 100))
+
+
+@pytest.mark.parametrize("text", ["", "short ü", "ü" * 70_000 + "tail"])
+def test_sha256_hex_matches_whole_buffer_hash(text):
+    assert sae._sha256_hex(text) == hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _patch(before: str, diff: str) -> list[str]:
+    """Apply a _unified_diff() result to ``before``, checking every context/removed line."""
+    src, out, pos = before.splitlines(), [], 0
+    lines = diff.split("\n")
+    # Skip the ---/+++ header
+    first_hunk = next((i for i, line in enumerate(lines) if line.startswith("@@")), len(lines))
+    for line in lines[first_hunk:]:
+        if line.startswith("@@"):
+            old = line.split()[1][1:]
+            start, _, length = old.partition(",")
+            start0 = int(start) - 1 if length != "0" else int(start)
+            out.extend(src[pos:start0])
+            pos = start0
+        elif line[:1] in (" ", "-"):
+            assert src[pos] == line[1:]
+            if line[0] == " ":
+                out.append(line[1:])
+            pos += 1
+        elif line[:1] == "+":
+            out.append(line[1:])
+    return out + src[pos:]
+
+
+def _random_single_edits(count: int):
+    rng = random.Random(0)
+    # Few distinct lines, so many edits have more than one valid alignment
+    words = ["{", "}", "", "    x++;", "    return;"]
+    for _ in range(count):
+        lines = [rng.choice(words) for _ in range(rng.randint(0, 30))]
+        edited = list(lines)
+        i = rng.randint(0, len(edited))
+        kind = rng.choice(("insert", "delete", "replace"))
+        if kind == "insert" or not edited:
+            edited.insert(i, rng.choice(words))
+        elif kind == "delete":
+            del edited[min(i, len(edited) - 1)]
+        else:
+            edited[min(i, len(edited) - 1)] = rng.choice(words)
+        yield "\n".join(lines), "\n".join(edited)
+
+
+@pytest.mark.parametrize("before,after", [
+    (SOURCE, SOURCE.replace("count = 1", "count = 2")),
+    (SOURCE, SOURCE.replace("    void Start()\n", "")),
+    (SOURCE, SOURCE + "// tail\n"),
+    ("", "one\ntwo\n"),
+])
+def test_unified_diff_is_a_valid_patch(before, after):
+    assert _patch(before, sae._unified_diff(before, after)) == after.splitlines()
+
+
+def test_unified_diff_of_ambiguous_edits_is_a_valid_patch():
+    # Alignment may differ from difflib's where several are valid; the patch must still apply
+    for before, after in _random_single_edits(300):
+        assert _patch(before, sae._unified_diff(before, after)) == after.splitlines()
+
+
+def test_unified_diff_can_align_repeated_lines_differently_from_difflib():
+    # Dropping one of two "{" lines: the trimmed prefix keeps the first, difflib keeps the second
+    before, after = "{\n{\n}", "{\n}"
+    diff = sae._unified_diff(before, after)
+    assert diff != "\n".join(difflib.unified_diff(
+        before.splitlines(), after.splitlines(), fromfile="before", tofile="after", n=3))
+    assert diff.splitlines()[-3:] == [" {", "-{", " }"]
+    assert _patch(before, diff) == after.splitlines()
+
+
+def test_unified_diff_of_identical_text_is_empty():
+    assert sae._unified_diff(SOURCE, SOURCE) == ""
+
+
+def test_unified_diff_truncates_at_limit():
+    before = "\n".join(f"line {i}" for i in range(100))
+    after = "\n".join(f"LINE {i}" for i in range(100))
+
+    diff = sae._unified_diff(before, after, limit=10)
+
+    assert diff.endswith("\n... (diff truncated) ...")
+    assert "-line 6\n" in diff
+    assert "line 7" not in diff